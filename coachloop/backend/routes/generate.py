@@ -1,14 +1,24 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-from backend.services.response_service import generate_ai_response  
+from backend.services.responseservice import generate_ai_response, search_documents
 
 router = APIRouter()
 
 class QueryRequest(BaseModel):
     role: str
     query: str
+    bypass_cache: bool = False
+
+class SearchRequest(BaseModel):
+    agent: str
+    query: str
+    k: int = 5
 
 @router.post("/generate_response")
 def generate_response(request: QueryRequest):
-    response = generate_ai_response(request.role, request.query)
+    response = generate_ai_response(request.role, request.query, use_cache=not request.bypass_cache)
     return {"response": response}
+
+@router.post("/search")
+def search(request: SearchRequest):
+    return {"results": search_documents(request.agent, request.query, request.k)}
@@ -4,7 +4,11 @@ import os
 # Add finetuning_data/embed_scripts to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../finetuning_data/embed_scripts")))
 
-from generate_response import get_response  # Assuming get_response is inside generate_response.py
+from generate_response import get_response  # Answers from the retriever's resident indexes
+from retriever import get_retriever
 
-def generate_ai_response(role, query):
-    return get_response(role, query)  # Call the function
+def generate_ai_response(role, query, use_cache=True):
+    return get_response(role, query, use_cache=use_cache)  # Call the function
+
+def search_documents(agent, query, k=5):
+    return get_retriever().search(query, agent, k)  # {score, agent, filename, text} per match
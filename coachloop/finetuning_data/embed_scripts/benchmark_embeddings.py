@@ -0,0 +1,119 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import openai
+
+import utils
+from embedding_cache import EmbeddingCache, set_embedding_cache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.abspath(os.path.join(BASE_DIR, "../virtual_trainer/agent_training/presentation_agent/cleaned_text"))
+EMBEDDING_DIM = 1536
+
+
+# Stand-in for the OpenAI embeddings endpoint with a fixed per-request latency
+class StandInEmbeddingHandler(BaseHTTPRequestHandler):
+    latency = 0.1
+    per_input_latency = 0.001
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        time.sleep(self.latency + self.per_input_latency * len(inputs))
+
+        data = []
+        for position, text in enumerate(inputs):
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+            vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+            data.append({"object": "embedding", "index": position, "embedding": vector.tolist()})
+
+        payload = json.dumps({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", utils.EMBEDDING_MODEL),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in_server(latency, per_input_latency):
+    """Start the stand-in server on a free local port and point the OpenAI client at it."""
+    StandInEmbeddingHandler.latency = latency
+    StandInEmbeddingHandler.per_input_latency = per_input_latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInEmbeddingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    openai.api_key = "stand-in"
+    openai.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1/"
+    return server
+
+
+def time_run(label, embed, texts):
+    """Run one embedding strategy against a cold cache and report chunks per second."""
+    # The throwaway cache and its directory are removed after the run
+    with tempfile.TemporaryDirectory(prefix="embedding_bench_") as cache_dir:
+        cache = EmbeddingCache(os.path.join(cache_dir, "cache.sqlite"))
+        set_embedding_cache(cache)
+        try:
+            start = time.perf_counter()
+            embeddings = embed(texts)
+            elapsed = time.perf_counter() - start
+        finally:
+            set_embedding_cache(None)
+            cache.conn.close()
+    embedded = sum(e is not None for e in embeddings)
+    print(f"📊 {label}: {embedded}/{len(texts)} chunks in {elapsed:.2f}s ({embedded / elapsed:.1f} chunks/s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-chunk and batched embedding throughput against a local stand-in server.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Folder of cleaned .txt files to chunk")
+    parser.add_argument("--limit", type=int, default=200, help="Maximum number of chunks to embed")
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated seconds per request")
+    parser.add_argument("--per-input-latency", type=float, default=0.001, help="Simulated seconds per input")
+    parser.add_argument("--batch-size", type=int, default=utils.EMBED_BATCH_SIZE)
+    parser.add_argument("--max-in-flight", type=int, default=utils.EMBED_MAX_IN_FLIGHT)
+    args = parser.parse_args()
+
+    texts, _ = utils.load_and_chunk_texts(args.corpus)
+    if not texts:
+        texts = [f"synthetic coaching passage {i} " * 200 for i in range(args.limit)]
+    texts = texts[:args.limit]
+
+    server = start_stand_in_server(args.latency, args.per_input_latency)
+    print(f"🚀 Stand-in embedding server at {openai.base_url} ({len(texts)} chunks)")
+
+    try:
+        loop_time = time_run("Per-chunk loop", lambda ts: [utils.get_openai_embedding(t) for t in ts], texts)
+        batch_time = time_run(
+            f"Batched (batch_size={args.batch_size})",
+            lambda ts: utils.get_openai_embeddings_batched(ts, batch_size=args.batch_size, max_in_flight=1),
+            texts,
+        )
+        concurrent_time = time_run(
+            f"Batched + concurrent (max_in_flight={args.max_in_flight})",
+            lambda ts: utils.get_openai_embeddings_batched(ts, batch_size=args.batch_size, max_in_flight=args.max_in_flight),
+            texts,
+        )
+        print(f"✅ Batched path is {loop_time / batch_time:.1f}x faster, {loop_time / concurrent_time:.1f}x with concurrency")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import time
+
+import faiss
+import numpy as np
+
+import index_factory
+from codec_report import load_reference_vectors, recall_at
+from index_catalog import INDEX_ROOT
+from memory_report import process_memory
+
+# Index structure / codec pairs measured against exact search; sizes below FAISS_ANN_MIN_VECTORS fall back to flat
+VARIANTS = [
+    ("flat", "none"),
+    ("flat", "sq8"),
+    ("flat", "pq"),
+    ("ivf_flat", "none"),
+    ("ivf_flat", "sq8"),
+    ("hnsw", "none"),
+    ("hnsw", "sq8"),
+]
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+SYNTHETIC_CLUSTERS = 256
+SYNTHETIC_NOISE = 0.3
+
+# A result counts as a regression when latency grows or throughput / recall drop by more than this
+LATENCY_TOLERANCE = 0.2
+RECALL_TOLERANCE = 0.01
+
+REPORT_VERSION = 1
+
+
+def synthetic_vectors(count, dimension, seed=index_factory.TRAINING_SEED, block=50000):
+    """Clustered Gaussian vectors, roughly the shape of real embeddings, generated in blocks to bound peak memory."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((SYNTHETIC_CLUSTERS, dimension)).astype(np.float32)
+    vectors = np.empty((count, dimension), dtype=np.float32)
+    for start in range(0, count, block):
+        end = min(start + block, count)
+        labels = rng.integers(0, SYNTHETIC_CLUSTERS, size=end - start)
+        vectors[start:end] = centers[labels] + SYNTHETIC_NOISE * rng.standard_normal((end - start, dimension), dtype=np.float32)
+    return vectors
+
+
+def fits_in_memory(count, dimension):
+    """Whether the vectors, the exact index and one variant (about 3 copies) fit in the free memory, where the OS says."""
+    try:
+        available = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return True
+    return count * dimension * 4 * 3 < available
+
+
+def latency_stats(index, queries, k, params):
+    """p50 / p99 / mean single-query latency in milliseconds."""
+    timings = np.empty(len(queries))
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        index.search(queries[i:i + 1], k, params=params)
+        timings[i] = time.perf_counter() - start
+    timings *= 1000
+    return {"p50_ms": float(np.percentile(timings, 50)), "p99_ms": float(np.percentile(timings, 99)), "mean_ms": float(timings.mean())}
+
+
+def run_case(corpus, database, queries, k, variants, latency_queries):
+    """Measure every variant on one database against exact search over it."""
+    exact = faiss.IndexFlatL2(database.shape[1])
+    exact.add(database)
+    _, truth = exact.search(queries, k)
+    del exact
+
+    ids = np.arange(len(database), dtype=np.int64)
+    results, seen = [], set()
+    for index_type, codec in variants:
+        config = index_factory.choose_index_config(index_type, len(database), database.shape[1], codec=codec)
+        if config["factory"] in seen:
+            continue  # Too few vectors for this structure; it fell back to one already measured
+        seen.add(config["factory"])
+
+        rss_before = process_memory()["rss_bytes"]
+        start = time.perf_counter()
+        index = index_factory.build_index(database, ids, config)
+        build_seconds = time.perf_counter() - start
+        rss_after = process_memory()["rss_bytes"]
+        params = index_factory.search_parameters(config)
+
+        start = time.perf_counter()
+        _, found = index.search(queries, k, params=params)
+        batch_seconds = time.perf_counter() - start
+
+        row = {
+            "corpus": corpus,
+            "vectors": len(database),
+            "dimension": database.shape[1],
+            "index_type": config["type"],
+            "codec": codec,
+            "factory": config["factory"],
+            "build_seconds": build_seconds,
+            **latency_stats(index, queries[:latency_queries], k, params),
+            "batch_queries": len(queries),
+            "batch_qps": len(queries) / batch_seconds,
+            "recall@1": recall_at(found, truth, 1),
+            f"recall@{k}": recall_at(found, truth, k),
+            "index_rss_bytes": None if rss_before is None else max(0, rss_after - rss_before),
+        }
+        print(f"   {row['factory']:<26} build {build_seconds:>7.2f}s  p50 {row['p50_ms']:>7.3f}ms  p99 {row['p99_ms']:>7.3f}ms  "
+              f"{row['batch_qps']:>9.0f} q/s  recall@{k} {row[f'recall@{k}']:.3f}")
+        results.append(row)
+        del index
+    return results
+
+
+def compare(results, baseline, k):
+    """Rows that got slower or less accurate than the matching row of an earlier report."""
+    previous = {(row["corpus"], row["vectors"], row["factory"]): row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        old = previous.get((row["corpus"], row["vectors"], row["factory"]))
+        if old is None:
+            continue
+        problems = []
+        for metric in ("p50_ms", "p99_ms"):
+            if row[metric] > old[metric] * (1 + LATENCY_TOLERANCE):
+                problems.append(f"{metric} {old[metric]:.3f} -> {row[metric]:.3f}")
+        if row["batch_qps"] < old["batch_qps"] * (1 - LATENCY_TOLERANCE):
+            problems.append(f"batch_qps {old['batch_qps']:.0f} -> {row['batch_qps']:.0f}")
+        recall = f"recall@{k}"
+        if recall in old and row[recall] < old[recall] - RECALL_TOLERANCE:
+            problems.append(f"{recall} {old[recall]:.3f} -> {row[recall]:.3f}")
+        if problems:
+            regressions.append({"corpus": row["corpus"], "vectors": row["vectors"], "factory": row["factory"], "changes": problems})
+    return regressions
+
+
+def environment():
+    return {
+        "faiss": faiss.__version__,
+        "numpy": np.__version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "faiss_threads": faiss.omp_get_max_threads(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build time, latency, throughput, recall and memory of the FAISS index variants.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated synthetic corpus sizes")
+    parser.add_argument("--dim", type=int, default=1536, help="Synthetic vector dimension (ada-002 is 1536)")
+    parser.add_argument("--queries", type=int, default=1000, help="Queries per case, for recall and batch throughput")
+    parser.add_argument("--latency-queries", type=int, default=200, help="Queries timed one at a time")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--variants", help="Comma-separated index_type/codec pairs (default: all), e.g. flat/none,hnsw/sq8")
+    parser.add_argument("--no-real", action="store_true", help="Skip the built corpora under the index folder")
+    parser.add_argument("--output", default="retrieval_benchmark.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    variants = [tuple(v.split("/")) for v in args.variants.split(",")] if args.variants else VARIANTS
+    results, skipped = [], []
+
+    for size in [int(size) for size in args.sizes.split(",") if size]:
+        if not fits_in_memory(size + args.queries, args.dim):
+            print(f"⚠️ Skipping {size:,} synthetic vectors: not enough free memory")
+            skipped.append({"corpus": "synthetic", "vectors": size, "reason": "memory"})
+            continue
+        vectors = synthetic_vectors(size + args.queries, args.dim)
+        print(f"\n📊 synthetic ({size:,} vectors, {args.dim} dims)")
+        results += run_case("synthetic", vectors[args.queries:], vectors[:args.queries], args.k, variants, args.latency_queries)
+        del vectors
+
+    if not args.no_real:
+        for index_dir in sorted(glob.glob(os.path.join(INDEX_ROOT, "*"))):
+            vectors = load_reference_vectors(index_dir)
+            if vectors is None or len(vectors) < 10 * args.k:
+                continue
+            # Hold out a tenth of the corpus as queries, like codec_report.py
+            order = np.random.default_rng(index_factory.TRAINING_SEED).permutation(len(vectors))
+            n_queries = min(args.queries, max(1, len(vectors) // 10))
+            name = os.path.basename(index_dir)
+            print(f"\n📊 {name} ({len(vectors) - n_queries:,} vectors, {vectors.shape[1]} dims)")
+            results += run_case(name, vectors[order[n_queries:]], vectors[order[:n_queries]], args.k, variants, args.latency_queries)
+
+    report = {
+        "version": REPORT_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "environment": environment(),
+        "settings": {"k": args.k, "queries": args.queries, "latency_queries": args.latency_queries, "dimension": args.dim},
+        "results": results,
+        "skipped": skipped,
+    }
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(results, json.load(f), args.k)
+        for regression in report["regressions"]:
+            print(f"⚠️ Regression in {regression['corpus']} / {regression['vectors']:,} / {regression['factory']}: "
+                  f"{', '.join(regression['changes'])}")
+        if not report["regressions"]:
+            print(f"\n✅ No regressions against {args.baseline}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Report saved at: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
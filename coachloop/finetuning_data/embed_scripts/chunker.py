@@ -0,0 +1,102 @@
+import re
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a character-based estimate
+    tiktoken = None
+
+# ada-002 / cl100k tokenizer, and the per-input limit of the embeddings endpoint
+ENCODING_NAME = "cl100k_base"
+MAX_TOKENS = 8191
+
+# Chunk budget and how much trailing context (whole sentences) is repeated in the next chunk
+CHUNK_TOKENS = 1000
+OVERLAP_TOKENS = 100
+
+# A sentence runs up to terminal punctuation (plus closing quotes/brackets) followed by whitespace
+SENTENCE = re.compile(r"\S.*?(?:[.!?]+[\"'”’)\]]*(?=\s)|$)", re.DOTALL)
+WORD = re.compile(r"\S+")
+
+_encoding = None
+
+
+def tokenizer_name():
+    return ENCODING_NAME if tiktoken is not None else "estimate"
+
+
+def count_tokens(text):
+    """Token count under the embedding model's tokenizer (a conservative estimate without tiktoken)."""
+    global _encoding
+    if tiktoken is None:
+        return len(text) // 3 + 1
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding(ENCODING_NAME)
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def _pieces(text, max_tokens):
+    """(start, end, tokens) for each sentence; sentences over budget are split at word boundaries."""
+    for match in SENTENCE.finditer(text):
+        start, end = match.span()
+        tokens = count_tokens(text[start:end])
+        if tokens <= max_tokens:
+            yield start, end, tokens
+            continue
+
+        piece_start = piece_end = None
+        piece_tokens = 0
+        for word in WORD.finditer(text, start, end):
+            word_tokens = count_tokens(word.group()) + 1
+            if piece_start is not None and piece_tokens + word_tokens > max_tokens:
+                yield piece_start, piece_end, piece_tokens
+                piece_start, piece_tokens = None, 0
+            if piece_start is None:
+                piece_start = word.start()
+            piece_end = word.end()
+            piece_tokens += word_tokens
+        if piece_start is not None:
+            yield piece_start, piece_end, piece_tokens
+
+
+def sentence_spans(text, max_tokens=MAX_TOKENS):
+    """(start, end, tokens) of every sentence in `text`, splitting any over `max_tokens` at word boundaries."""
+    return list(_pieces(text, max_tokens))
+
+
+def chunk_spans(text, max_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS):
+    """Split `text` into (start, end) offsets of chunks that end on sentence boundaries.
+
+    Each chunk holds at most `max_tokens` tokens, and repeats up to `overlap_tokens`
+    of whole trailing sentences from the previous chunk. Slicing is left to the caller.
+    """
+    max_tokens = min(max_tokens, MAX_TOKENS)
+    pieces = list(_pieces(text, max_tokens))
+    spans = []
+    i = 0
+    while i < len(pieces):
+        j, total = i, 0
+        while j < len(pieces) and (j == i or total + pieces[j][2] <= max_tokens):
+            total += pieces[j][2]
+            j += 1
+        spans.append((pieces[i][0], pieces[j - 1][1]))
+        if j == len(pieces):
+            break
+
+        # Step back over trailing sentences that fit in the overlap budget, always moving forward
+        k, overlap = j, 0
+        while k - 1 > i and overlap + pieces[k - 1][2] <= overlap_tokens:
+            k -= 1
+            overlap += pieces[k][2]
+        # Skip the overlap if it would leave no room for anything new
+        i = k if overlap + pieces[j][2] <= max_tokens else j
+    return spans
+
+
+def chunk_text(text, max_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS):
+    """Chunk strings, for callers that want text rather than offsets."""
+    return [text[start:end] for start, end in chunk_spans(text, max_tokens, overlap_tokens)]
+
+
+def chunker_settings():
+    """Settings recorded with an index, so a change forces chunks to be rebuilt."""
+    return {"max_tokens": CHUNK_TOKENS, "overlap_tokens": OVERLAP_TOKENS, "tokenizer": tokenizer_name()}
@@ -0,0 +1,112 @@
+import argparse
+import glob
+import json
+import os
+
+import faiss
+import numpy as np
+
+import index_factory
+from embedding_export import load_embedding_export
+from index_catalog import INDEX_ROOT
+
+# (codec, PCA output dimension) pairs compared against the exact float32 index
+VARIANTS = [
+    ("none", None),
+    ("fp16", None),
+    ("sq8", None),
+    ("pq", None),
+    ("fp16", 256),
+    ("sq8", 256),
+    ("pq", 256),
+]
+
+
+def load_reference_vectors(index_dir):
+    """Exact float32 vectors for an index folder: from a flat index, else from the embedding export."""
+    for index_path in glob.glob(os.path.join(index_dir, "faiss_index_*.index")):
+        index = faiss.read_index(index_path)
+        base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        if isinstance(base, faiss.IndexFlat):
+            return base.reconstruct_n(0, base.ntotal)
+
+    for vectors_path in glob.glob(os.path.join(index_dir, "embeddings_*.npy")):
+        if not vectors_path.endswith(".ids.npy"):
+            export = load_embedding_export(vectors_path[:-len(".npy")])
+            return export.as_float32()
+    return None
+
+
+def recall_at(found, truth, k):
+    """Share of the true top-k neighbours that the index also returned in its top k."""
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def evaluate(name, vectors, index_type, k, query_fraction=0.1):
+    """Hold out a query set, then measure every codec variant against exact search.
+
+    Each row's "k" is the k actually used, which is smaller than asked for on tiny corpora.
+    """
+    rng = np.random.default_rng(index_factory.TRAINING_SEED)
+    order = rng.permutation(len(vectors))
+    n_queries = max(1, int(len(vectors) * query_fraction))
+    queries, database = vectors[order[:n_queries]], vectors[order[n_queries:]]
+    ids = np.arange(len(database), dtype=np.int64)
+    k = min(k, len(database))
+
+    exact = faiss.IndexFlatL2(database.shape[1])
+    exact.add(database)
+    _, truth = exact.search(queries, k)
+    flat_bytes = len(faiss.serialize_index(exact))
+
+    results = []
+    for codec, pca_dim in VARIANTS:
+        config = index_factory.choose_index_config(index_type, len(database), database.shape[1], codec=codec, pca_dim=pca_dim)
+        if pca_dim and "pca_dim" not in config:
+            continue  # Too few vectors to train this PCA
+        index = index_factory.build_index(database, ids, config)
+        _, found = index.search(queries, k)
+        size = len(faiss.serialize_index(index))
+        results.append({
+            "index": name,
+            "factory": config["factory"],
+            "vectors": len(database),
+            "bytes": size,
+            "bytes_per_vector": size / len(database),
+            "compression": flat_bytes / size,
+            "k": k,
+            "recall@1": recall_at(found, truth, 1),
+            f"recall@{k}": recall_at(found, truth, k),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall versus memory of the vector codecs on the existing corpora.")
+    parser.add_argument("--index-type", choices=index_factory.INDEX_TYPES, default="flat")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    report = []
+    for index_dir in sorted(glob.glob(os.path.join(INDEX_ROOT, "*"))):
+        vectors = load_reference_vectors(index_dir)
+        if vectors is None or len(vectors) < 10:
+            continue
+        name = os.path.basename(index_dir)
+        print(f"\n📊 {name} ({len(vectors)} vectors, {vectors.shape[1]} dims)")
+        for row in evaluate(name, vectors, args.index_type, args.k):
+            k = row["k"]
+            print(f"   {row['factory']:<28} {row['bytes_per_vector']:>8.0f} B/vec  {row['compression']:>5.1f}x  "
+                  f"recall@1 {row['recall@1']:.3f}  recall@{k} {row[f'recall@{k}']:.3f}")
+            report.append(row)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved at: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
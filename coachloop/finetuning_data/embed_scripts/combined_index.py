@@ -0,0 +1,117 @@
+import os
+
+import faiss
+import numpy as np
+
+from index_catalog import CATALOG, COMBINED, INDEX_ROOT, index_paths, select_partitions
+from index_factory import read_index, search_parameters
+from index_manifest import check_index_files, check_loaded_index, load_manifest
+from metadata_store import load_metadata_store
+
+
+def partition_build(name, root=INDEX_ROOT):
+    """What the combined index records of a corpus's build (vector count and file checksums), or None without a manifest."""
+    build = (load_manifest(index_paths(CATALOG[name], root)["manifest"]) or {}).get("build")
+    if build is None:
+        return None
+    return {key: build[key] for key in ("vectors", "index_sha256", "metadata_sha256")}
+
+
+def manifest_signature(root=INDEX_ROOT):
+    """Modification times of the combined and per-corpus manifests; a rebuild of any of them changes it."""
+    paths = [index_paths(COMBINED, root)["manifest"]] + [index_paths(CATALOG[name], root)["manifest"] for name in CATALOG]
+    return tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in paths)
+
+
+# One index over every corpus; each corpus is a contiguous ID range tagged with its agent and source type
+#
+# Each partition records the build of the corpus it was copied from. A corpus rebuilt since then
+# is stale here, and searches that need it go to its own index until the combined one is rebuilt.
+class CombinedIndex:
+    def __init__(self, root=INDEX_ROOT, embedding_model=None, dimension=None):
+        paths = index_paths(COMBINED, root)
+        # The partition table lives in the manifest, so the combined index cannot load without one
+        manifest, problems = check_index_files(paths["manifest"], paths["index"], paths["metadata"], embedding_model, dimension)
+        if manifest is None or problems:
+            raise ValueError(f"Combined index does not match its manifest: {'; '.join(problems or ['no manifest'])}")
+        self.index = read_index(paths["index"])
+        problems = check_loaded_index(manifest, self.index, dimension)
+        if problems:
+            raise ValueError(f"Combined index does not match its manifest: {'; '.join(problems)}")
+        self.metadata = load_metadata_store(paths["metadata"])
+        self.embedding_model = manifest["embedding_model"]
+        self.config = manifest["index"]
+        self.partitions = manifest["partitions"]
+        self.stale = [
+            name for name, partition in self.partitions.items()
+            if name not in CATALOG or partition.get("build") is None or partition["build"] != partition_build(name, root)
+        ]
+        if self.stale:
+            print(f"⚠️ The combined index is out of date for {', '.join(self.stale)}; "
+                  f"they are searched per corpus until it is rebuilt (utils.py --combined).")
+
+    def covers(self, names):
+        """Whether every one of the named corpora is in the combined index and up to date there."""
+        return all(name in self.partitions and name not in self.stale for name in names)
+
+    def selector(self, names):
+        """ID selector covering the given partitions, or None when that is every partition.
+
+        Returns (selector, parts); `parts` keeps the child selectors alive for as long as the search runs.
+        """
+        if set(names) == set(self.partitions):
+            return None, []
+        parts = [faiss.IDSelectorRange(*self.partitions[name]["ids"]) for name in names]
+        selector = parts[0]
+        for part in parts[1:]:
+            selector = faiss.IDSelectorOr(selector, part)
+            parts.append(selector)
+        return selector, parts
+
+    def partition_of(self, i):
+        for name, partition in self.partitions.items():
+            start, end = partition["ids"]
+            if start <= i < end:
+                return name
+        return None
+
+    def search(self, query_embedding, k=5, names=None, agents=None, sources=None):
+        """Top-k chunks from the partitions matching the filters (all of them by default).
+
+        Returns dicts with the score (L2 distance), partition, agent, source type, filename and text.
+        """
+        names = [name for name in select_partitions(names, agents, sources) if name in self.partitions]
+        if not names:
+            return []
+
+        selector, parts = self.selector(names)
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        distances, ids = self.index.search(query, k, params=search_parameters(self.config, selector))
+        del parts
+
+        results = []
+        for distance, i in zip(distances[0], ids[0]):
+            meta = self.metadata[i] if i >= 0 else None
+            if meta is None:
+                continue
+            partition = self.partition_of(i)
+            results.append({
+                "score": float(distance),
+                "partition": partition,
+                "agent": self.partitions[partition]["agent"],
+                "source": self.partitions[partition]["source"],
+                **meta,
+            })
+        return results
+
+
+def load_combined_index(root=INDEX_ROOT, embedding_model=None, dimension=None):
+    """Open the combined index, or None if it has not been built or does not match its manifest."""
+    if not os.path.exists(index_paths(COMBINED, root)["index"]):
+        print("⚠️ The combined index has not been built yet (utils.py --combined).")
+        return None
+    try:
+        return CombinedIndex(root, embedding_model, dimension)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return None
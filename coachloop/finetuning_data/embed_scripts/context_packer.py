@@ -0,0 +1,86 @@
+import os
+
+from chunker import count_tokens, sentence_spans
+from lexical_index import tokenize
+
+# Prompt tokens for the retrieved passages and the question together, so every chat call is about the same size
+CONTEXT_TOKENS = int(os.getenv("CONTEXT_TOKENS", 1500))
+
+# No one passage takes more than this, so the lower-ranked hits still get a share of the budget
+PASSAGE_TOKENS = int(os.getenv("CONTEXT_PASSAGE_TOKENS", 400))
+
+# Tokens reserved for the instructions and passage labels around the context
+PROMPT_OVERHEAD_TOKENS = 40
+
+GAP = " … "
+
+
+def _sentence_key(sentence):
+    """Sentences repeated by overlapping chunks compare equal regardless of spacing or case."""
+    return " ".join(sentence.split()).casefold()
+
+
+def trim_passage(text, query_terms, budget, seen):
+    """The sentences of one passage that matter most for the query, within `budget` tokens, in reading order.
+
+    Sentences in `seen` (already packed from a higher-ranked hit) and repeats within the passage are
+    skipped; the sentences kept are added to `seen`.
+    A sentence's relevance is how many distinct query terms it contains; ties keep the earlier sentence.
+    """
+    candidates, keys = [], set(seen)
+    for position, (start, end, tokens) in enumerate(sentence_spans(text, budget)):
+        sentence = text[start:end]
+        if _sentence_key(sentence) in keys:
+            continue
+        keys.add(_sentence_key(sentence))
+        relevance = len(query_terms.intersection(tokenize(sentence)))
+        candidates.append((-relevance, position, sentence, tokens))
+
+    kept, used = [], 0
+    for _, position, sentence, tokens in sorted(candidates):
+        if used + tokens <= budget:
+            kept.append((position, sentence))
+            used += tokens
+
+    parts, previous = [], None
+    for position, sentence in sorted(kept):
+        if previous is not None and position != previous + 1:
+            parts.append(GAP)
+        elif previous is not None:
+            parts.append(" ")
+        parts.append(sentence)
+        previous = position
+        seen.add(_sentence_key(sentence))
+    return "".join(parts), used
+
+
+def pack_context(query, hits, budget=CONTEXT_TOKENS, passage_tokens=PASSAGE_TOKENS):
+    """Fit the best parts of ranked search hits into a prompt-token budget next to the query.
+
+    Hits are taken best first; sentences a higher-ranked hit already contributed (overlapping
+    chunks repeat their boundary sentences) are dropped, and each hit is trimmed to its most
+    query-relevant sentences. Returns the passages as {"agent", "filename", "text", "tokens"}.
+    """
+    remaining = budget - count_tokens(query) - PROMPT_OVERHEAD_TOKENS
+    query_terms = set(tokenize(query))
+    seen, passages = set(), []
+    for hit in hits:
+        if remaining <= 0:
+            break
+        text, tokens = trim_passage(hit["text"], query_terms, min(passage_tokens, remaining), seen)
+        if not text:
+            continue
+        passages.append({"agent": hit.get("agent"), "filename": hit.get("filename"), "text": text, "tokens": tokens})
+        remaining -= tokens
+    return passages
+
+
+def format_prompt(query, passages):
+    """The user's question, after the packed passages when there are any."""
+    if not passages:
+        return query
+    context = "\n\n".join(
+        f"[{i}] ({passage['filename']}) {passage['text']}" if passage["filename"] else f"[{i}] {passage['text']}"
+        for i, passage in enumerate(passages, 1)
+    )
+    return f"Use these passages from the training material where they help.\n\n{context}\n\nQuestion: {query}"
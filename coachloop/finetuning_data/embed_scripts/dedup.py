@@ -0,0 +1,125 @@
+import os
+import re
+import zlib
+
+import numpy as np
+
+from chunker import count_tokens
+
+# Chunks whose estimated Jaccard similarity (over word shingles) reaches this are dropped; 0 disables
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.85))
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+MINHASH_SEED = 1234
+
+# Universal hashing (a * x + b) mod p over a Mersenne prime, truncated to 32 bits
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+WORD = re.compile(r"\w+")
+
+
+def _permutations(num_perm, seed=MINHASH_SEED):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def lsh_bands(threshold, num_perm=NUM_PERM):
+    """(bands, rows) whose LSH S-curve crosses 50% closest to `threshold`."""
+    pairs = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    return min(pairs, key=lambda pair: abs((1 / pair[0]) ** (1 / pair[1]) - threshold))
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Hashes of the lower-cased word n-grams of `text`."""
+    words = WORD.findall(text.lower())
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+# Drops chunks that are near-duplicates of a chunk it has already kept
+class NearDuplicateFilter:
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM):
+        self.threshold = threshold
+        self.a, self.b = _permutations(num_perm)
+        self.bands, self.rows = lsh_bands(threshold, num_perm) if threshold > 0 else (0, 0)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.signatures = []
+        self.kept = 0
+        self.dropped = 0
+        self.bytes_saved = 0
+        self.tokens_saved = 0
+
+    def signature(self, text):
+        hashes = np.fromiter(shingles(text), dtype=np.uint64)
+        values = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+        return values.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _insert(self, signature, keys):
+        slot = len(self.signatures)
+        self.signatures.append(signature)
+        for band, key in enumerate(keys):
+            self.buckets[band].setdefault(key, []).append(slot)
+
+    def seed(self, text):
+        """Remember an already indexed chunk, so new chunks are compared against it too."""
+        if self.threshold > 0:
+            signature = self.signature(text)
+            self._insert(signature, self._band_keys(signature))
+
+    def add(self, text):
+        """Check `text` against the kept chunks; keep and return True unless it is a near-duplicate."""
+        if self.threshold <= 0:
+            self.kept += 1
+            return True
+
+        signature = self.signature(text)
+        keys = self._band_keys(signature)
+        candidates = {slot for band, key in enumerate(keys) for slot in self.buckets[band].get(key, ())}
+        for slot in candidates:
+            if np.mean(self.signatures[slot] == signature) >= self.threshold:
+                self.dropped += 1
+                self.bytes_saved += len(text.encode("utf-8"))
+                self.tokens_saved += count_tokens(text)
+                return False
+
+        self._insert(signature, keys)
+        self.kept += 1
+        return True
+
+    def filter(self, items, text_of=lambda item: item, on_drop=None):
+        """Yield the items of a stream whose text is not a near-duplicate of an earlier one."""
+        for item in items:
+            if self.add(text_of(item)):
+                yield item
+            elif on_drop is not None:
+                on_drop(item)
+
+    def report(self):
+        seen = self.kept + self.dropped
+        share = self.dropped / seen if seen else 0.0
+        return (f"🧬 Near-duplicates (threshold {self.threshold:.2f}): dropped {self.dropped} of {seen} chunks ({share:.0%}), "
+                f"saving {self.bytes_saved / 1024:,.1f} KiB and {self.tokens_saved:,} tokens")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from pipeline import iter_chunks, iter_documents
+
+    parser = argparse.ArgumentParser(description="Report how many chunks of a corpus are near-duplicates.")
+    parser.add_argument("folder", help="Folder of source files to chunk")
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD or 0.85)
+    args = parser.parse_args()
+
+    dedup = NearDuplicateFilter(args.threshold)
+    for _ in dedup.filter(iter_chunks(iter_documents(args.folder)), text_of=lambda chunk: chunk[1]):
+        pass
+    print(dedup.report())
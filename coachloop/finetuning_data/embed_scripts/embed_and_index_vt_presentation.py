@@ -1,9 +1,10 @@
+import sys
 from utils import create_faiss_index  
 
 if __name__ == "__main__":
     training_type = "presentation"  
     print(f"\n🚀 Processing {training_type}...\n")
-    create_faiss_index(training_type)
+    create_faiss_index(training_type, incremental="--incremental" in sys.argv[1:], export_csv="--csv" in sys.argv[1:])
 
 
 
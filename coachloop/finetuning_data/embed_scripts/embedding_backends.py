@@ -0,0 +1,108 @@
+import hashlib
+import math
+import os
+import threading
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+import openai
+
+from lexical_index import tokenize
+
+# Backend for index builds and queries: "openai" (text-embedding-ada-002) or "local" (offline, deterministic)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+OPENAI_EMBEDDING_DIM = 1536
+
+# Local backend: output dimension, projection seed, and feature directions kept in memory
+# (each is LOCAL_EMBEDDING_DIM float32s, so 4096 of them are about 6 MB per worker)
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", 384))
+LOCAL_EMBEDDING_SEED = 1234
+LOCAL_FEATURE_CACHE = int(os.getenv("LOCAL_FEATURE_CACHE", 4096))
+
+
+# Embeddings from the OpenAI API, one request per batch
+class OpenAIBackend:
+    name = "openai"
+    remote = True
+
+    def __init__(self, model=OPENAI_EMBEDDING_MODEL, dimension=OPENAI_EMBEDDING_DIM):
+        # The model name is the cache key and what manifests record, so it stays the bare API model
+        self.model = model
+        self.dimension = dimension
+
+    def embed(self, texts):
+        response = openai.embeddings.create(input=list(texts), model=self.model)
+        # The API returns one item per input, tagged with its position in the request
+        data = sorted(response.data, key=lambda item: item.index)
+        return [item.embedding for item in data]
+
+    def describe(self):
+        return {"name": self.name, "model": self.model, "dimension": self.dimension}
+
+
+# Offline embeddings: hashed word and word-pair features, sublinear TF weighted, randomly projected to a dense vector
+#
+# Every feature maps to a fixed Gaussian direction seeded by its hash, so a text's vector is
+# the random projection of its (unbounded) hashed feature vector, with no collisions and no
+# projection matrix to store. There is no corpus-fitted IDF: query vectors must not depend on
+# which corpus was indexed, and stop-word removal plus sublinear TF play its part instead.
+class LocalHashingBackend:
+    name = "local"
+    remote = False
+
+    def __init__(self, dimension=LOCAL_EMBEDDING_DIM, seed=LOCAL_EMBEDDING_SEED):
+        self.dimension = dimension
+        self.seed = seed
+        self.model = f"local-hashed-rp-{dimension}d-s{seed}-v1"
+        self.direction = lru_cache(maxsize=LOCAL_FEATURE_CACHE)(self._direction)
+
+    def _direction(self, feature):
+        digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        return np.random.default_rng((self.seed, digest)).standard_normal(self.dimension).astype(np.float32)
+
+    def features(self, text):
+        tokens = tokenize(text)
+        return Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+
+    def embed_one(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature, tf in self.features(text).items():
+            vector += (1 + math.log(tf)) * self.direction(feature)
+        # A text with no features stays all zeros; index builds drop such chunks
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, texts):
+        return [self.embed_one(text) for text in texts]
+
+    def describe(self):
+        return {"name": self.name, "model": self.model, "dimension": self.dimension}
+
+
+EMBEDDING_BACKENDS = {}
+
+
+def register_backend(name, factory):
+    """Add or replace a backend; `factory()` returns an object with name, model, dimension, remote, embed and describe."""
+    EMBEDDING_BACKENDS[name] = factory
+
+
+register_backend("openai", OpenAIBackend)
+register_backend("local", LocalHashingBackend)
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_embedding_backend(name=None):
+    """One shared instance per backend name (default: EMBEDDING_BACKEND)."""
+    name = name or EMBEDDING_BACKEND
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}'. Use one of: {', '.join(EMBEDDING_BACKENDS)}")
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = EMBEDDING_BACKENDS[name]()
+        return _backends[name]
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# On-disk cache location and size budget (bytes of stored vectors)
+CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(BASE_DIR, "indexes", "embedding_cache.sqlite"))
+CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+EVICT_TO_FRACTION = 0.9
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+# Content-addressed embedding cache keyed by (model, sha256(text)), stored in SQLite
+class EmbeddingCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model, texts, count=True):
+        """Return cached vectors (float32) for `texts`, with None for every miss.
+
+        `count=False` leaves the hit / miss stats alone, for re-reads of vectors a build has just stored.
+        """
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        with self.lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                part = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self.conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *part],
+                )
+                found.update(rows)
+            if found:
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(time.time(), model, h) for h in found],
+                )
+                self.conn.commit()
+
+        results = [np.frombuffer(found[h], dtype=np.float32) if h in found else None for h in hashes]
+        if count:
+            hits = sum(r is not None for r in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def get(self, model, text):
+        return self.get_many(model, [text])[0]
+
+    def put_many(self, model, texts, vectors):
+        """Store vectors for `texts`, skipping any that are None, then evict if over budget."""
+        now = time.time()
+        rows = [
+            (model, text_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+            if vector is not None
+        ]
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self.conn.commit()
+            self.total_bytes += sum(len(row[2]) for row in rows)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def put(self, model, text, vector):
+        self.put_many(model, [text], [vector])
+
+    def _evict(self):
+        """Drop least-recently-used vectors until the cache is back under its budget."""
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        target = self.max_bytes * EVICT_TO_FRACTION
+        rows = self.conn.execute("SELECT rowid, LENGTH(vector) FROM embeddings ORDER BY last_used")
+        doomed = []
+        for rowid, size in rows:
+            if self.total_bytes <= target:
+                break
+            doomed.append((rowid,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM embeddings WHERE rowid = ?", doomed)
+        self.conn.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Process-wide cache shared by the build scripts and the query paths."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
+
+
+def set_embedding_cache(cache):
+    """Swap the process-wide cache, e.g. for a throwaway cache in benchmarks."""
+    global _default_cache
+    with _default_cache_lock:
+        _default_cache = cache
+
+
+if __name__ == "__main__":
+    stats = get_embedding_cache().stats()
+    print(f"🗄️ Embedding cache at {CACHE_PATH}")
+    print(f"📌 Entries: {stats['entries']}")
+    print(f"📌 Size: {stats['bytes'] / 1024 ** 2:.1f} MiB of {stats['max_bytes'] / 1024 ** 2:.0f} MiB")
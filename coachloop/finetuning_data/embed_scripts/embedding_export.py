@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+# Export layout for a prefix such as indexes/vt_presentation/embeddings_vt_presentation:
+#   <prefix>.npy        float16 (default) or float32 vectors, one row per chunk, ordered by ID
+#   <prefix>.ids.npy    structured rows (id int64, file int32) aligned with the vectors
+#   <prefix>.files.json filename table that the `file` column points into
+EXPORT_DTYPES = {"float16": np.float16, "float32": np.float32}
+ROW_DTYPE = np.dtype([("id", "<i8"), ("file", "<i4")])
+
+
+def export_paths(prefix):
+    return f"{prefix}.npy", f"{prefix}.ids.npy", f"{prefix}.files.json"
+
+
+def _finish_npy(body_path, path, dtype, shape):
+    """Prepend a .npy header to a file of raw rows."""
+    header = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": shape}
+    with open(path, "wb") as out, open(body_path, "rb") as body:
+        np.lib.format.write_array_header_1_0(out, header)
+        shutil.copyfileobj(body, out, 1 << 20)
+    os.remove(body_path)
+
+
+# Streams blocks of rows into an export; the row count is only needed when it is closed
+class EmbeddingExportWriter:
+    def __init__(self, prefix, dtype="float16"):
+        self.vectors_path, self.rows_path, self.files_path = export_paths(prefix)
+        self.dtype = EXPORT_DTYPES[dtype]
+        self.vectors_file = open(f"{self.vectors_path}.tmp", "wb")
+        self.rows_file = open(f"{self.rows_path}.tmp", "wb")
+        self.count = 0
+        self.dimension = 0
+        self.table = {}
+
+    def add(self, ids, vectors, filenames):
+        """Append rows for `ids`; `filenames` is one entry per row."""
+        vectors = np.asarray(vectors)
+        rows = np.empty(len(ids), dtype=ROW_DTYPE)
+        rows["id"] = ids
+        rows["file"] = [self.table.setdefault(name, len(self.table)) for name in filenames]
+
+        self.vectors_file.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+        self.rows_file.write(rows.tobytes())
+        self.count += len(ids)
+        if len(ids):
+            self.dimension = vectors.shape[1]
+
+    def close(self):
+        self.vectors_file.close()
+        self.rows_file.close()
+        _finish_npy(self.vectors_file.name, self.vectors_path, self.dtype, (self.count, self.dimension))
+        _finish_npy(self.rows_file.name, self.rows_path, ROW_DTYPE, (self.count,))
+        with open(self.files_path, "w", encoding="utf-8") as f:
+            json.dump(list(self.table), f, ensure_ascii=False)
+        return self.vectors_path
+
+
+def write_embedding_export(prefix, ids, vectors, filenames, dtype="float16"):
+    """Write vectors plus their ID/filename sidecars; `filenames` is one entry per row."""
+    writer = EmbeddingExportWriter(prefix, dtype=dtype)
+    writer.add(ids, vectors, filenames)
+    return writer.close()
+
+
+# Memory-mapped view of an export written by write_embedding_export
+class EmbeddingExport:
+    def __init__(self, prefix, mmap=True):
+        vectors_path, rows_path, files_path = export_paths(prefix)
+        mode = "r" if mmap else None
+        self.vectors = np.load(vectors_path, mmap_mode=mode)
+        self.rows = np.load(rows_path, mmap_mode=mode)
+        with open(files_path, "r", encoding="utf-8") as f:
+            self.filenames = json.load(f)
+
+    @property
+    def ids(self):
+        return self.rows["id"]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def filename(self, row):
+        return self.filenames[int(self.rows["file"][row])]
+
+    def as_float32(self, start=0, end=None):
+        """Copy a block of rows into float32, the dtype FAISS expects."""
+        return np.ascontiguousarray(self.vectors[start:end], dtype=np.float32)
+
+
+def load_embedding_export(prefix, mmap=True):
+    """Open an export, or None if it has not been written."""
+    if not os.path.exists(export_paths(prefix)[0]):
+        return None
+    return EmbeddingExport(prefix, mmap=mmap)
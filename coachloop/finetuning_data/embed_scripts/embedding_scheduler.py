@@ -0,0 +1,215 @@
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+DEFAULT_BACKOFF = 5.0
+MAX_RATE_LIMIT_RETRIES = 10
+
+
+# Token buckets for a requests-per-minute and a tokens-per-minute budget
+class RateLimiter:
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.request_allowance = float(requests_per_minute)
+        self.token_allowance = float(tokens_per_minute)
+        self.paused_until = 0.0
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.request_allowance = min(self.rpm, self.request_allowance + elapsed * self.rpm / 60.0)
+        self.token_allowance = min(self.tpm, self.token_allowance + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens):
+        """Block until one request carrying `tokens` fits in both budgets."""
+        tokens = min(tokens, self.tpm)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.request_allowance >= 1 and self.token_allowance >= tokens:
+                        self.request_allowance -= 1
+                        self.token_allowance -= tokens
+                        return
+                    wait = max(
+                        (1 - self.request_allowance) * 60.0 / self.rpm,
+                        (tokens - self.token_allowance) * 60.0 / self.tpm,
+                    )
+            time.sleep(min(max(wait, 0.01), 1.0))
+
+    def pause(self, seconds):
+        """Hold back every caller for `seconds`, e.g. after a 429."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+# Stand-in limiter for backends without a request quota (local models)
+class NoRateLimit:
+    def acquire(self, tokens):
+        pass
+
+    def pause(self, seconds):
+        pass
+
+
+NO_RATE_LIMIT = NoRateLimit()
+
+_shared_limiters = {}
+_shared_limiters_lock = threading.Lock()
+
+
+def get_shared_rate_limiter(requests_per_minute, tokens_per_minute):
+    """Return one limiter per budget so consecutive index builds share the same quota."""
+    key = (requests_per_minute, tokens_per_minute)
+    with _shared_limiters_lock:
+        if key not in _shared_limiters:
+            _shared_limiters[key] = RateLimiter(requests_per_minute, tokens_per_minute)
+        return _shared_limiters[key]
+
+
+def _parse_duration(value):
+    """Parse OpenAI reset hints such as '1.5', '20ms', '6m0s' into seconds."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    parts = re.findall(r"([\d.]+)(ms|s|m|h)", value or "")
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def retry_after_seconds(error):
+    """Read the retry-after hint from a 429 response, if the server sent one."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        return float(headers["retry-after-ms"]) / 1000.0
+    for header in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        seconds = _parse_duration(headers.get(header))
+        if seconds is not None:
+            return seconds
+    return None
+
+
+def is_rate_limit_error(error):
+    return getattr(error, "status_code", None) == 429
+
+
+# Keeps several embedding requests in flight while staying inside the rate budget
+class EmbeddingScheduler:
+    def __init__(self, embed_fn, count_tokens, rate_limiter, max_in_flight=8, max_retries=3):
+        self.embed_fn = embed_fn
+        self.count_tokens = count_tokens
+        self.rate_limiter = rate_limiter
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.stats_lock = threading.Lock()
+        self.tokens_sent = 0
+        self.rate_limited = 0
+
+    def _call(self, texts, tokens):
+        """One request, waiting out 429s using the server's retry hint."""
+        for _ in range(MAX_RATE_LIMIT_RETRIES):
+            self.rate_limiter.acquire(tokens)
+            try:
+                result = self.embed_fn(texts)
+                with self.stats_lock:
+                    self.tokens_sent += tokens
+                return result
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                with self.stats_lock:
+                    self.rate_limited += 1
+                self.rate_limiter.pause(retry_after_seconds(e) or DEFAULT_BACKOFF)
+        raise RuntimeError(f"Still rate limited after {MAX_RATE_LIMIT_RETRIES} attempts")
+
+    def embed_batch(self, texts):
+        """Embed one batch, retrying and then bisecting only the part that fails."""
+        tokens = sum(self.count_tokens(text) for text in texts)
+        for attempt in range(self.max_retries):
+            try:
+                return self._call(texts, tokens)
+            except Exception as e:
+                print(f"⚠️ Embedding batch of {len(texts)} failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                time.sleep(2 ** attempt)
+
+        if len(texts) == 1:
+            print("❌ Giving up on a chunk after repeated embedding failures.")
+            return [None]
+
+        middle = len(texts) // 2
+        return self.embed_batch(texts[:middle]) + self.embed_batch(texts[middle:])
+
+    def _mark(self):
+        """Clock and counters at the start of a run; _report shows the difference, so each run reports only its own traffic."""
+        with self.stats_lock:
+            return time.monotonic(), self.tokens_sent, self.rate_limited
+
+    def _report(self, progress, since):
+        start, tokens_sent, rate_limited = since
+        elapsed = max(time.monotonic() - start, 1e-6)
+        with self.stats_lock:
+            tokens_sent, rate_limited = self.tokens_sent - tokens_sent, self.rate_limited - rate_limited
+        progress.set_postfix(
+            chunks_s=f"{progress.n / elapsed:.1f}",
+            tok_min=f"{tokens_sent * 60 / elapsed:,.0f}",
+            throttled=rate_limited,
+        )
+
+    def run(self, texts, batches, desc="Generating Embeddings", on_batch=None):
+        """Embed `texts` grouped into `batches` of positions; results stay in input order.
+
+        `on_batch(positions, embeddings)` is called as each batch lands, so callers can
+        persist progress before the whole run finishes.
+        """
+        embeddings = [None] * len(texts)
+        since = self._mark()
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool, tqdm(total=len(texts), desc=desc) as progress:
+            futures = {pool.submit(self.embed_batch, [texts[p] for p in positions]): positions for positions in batches}
+            for future in as_completed(futures):
+                positions = futures[future]
+                results = future.result()
+                for position, embedding in zip(positions, results):
+                    embeddings[position] = embedding
+                if on_batch is not None:
+                    on_batch(positions, results)
+                progress.update(len(positions))
+                self._report(progress, since)
+        return embeddings
+
+    def stream(self, batches, embed=None, desc="Generating Embeddings", total=None):
+        """Lazily embed an iterable of batches, yielding (batch, embeddings) in input order.
+
+        Only a bounded number of batches is read ahead, so memory does not grow with the
+        input. `embed(batch)` defaults to embed_batch, i.e. batches that are lists of texts.
+        """
+        embed = embed or self.embed_batch
+        batches = iter(batches)
+        pending = deque()
+        since = self._mark()
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool, tqdm(total=total, desc=desc) as progress:
+            while True:
+                while len(pending) < 2 * self.max_in_flight:
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                    pending.append((batch, pool.submit(embed, batch)))
+                if not pending:
+                    return
+                batch, future = pending.popleft()
+                results = future.result()
+                progress.update(len(batch))
+                self._report(progress, since)
+                yield batch, results
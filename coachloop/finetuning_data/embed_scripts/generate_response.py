@@ -1,8 +1,9 @@
 import os
 import json
-import faiss
-import numpy as np
 import openai
+from retriever import get_query_embedding, get_retriever
+from context_packer import CONTEXT_TOKENS, format_prompt, pack_context
+from response_cache import RESPONSE_CACHE, get_response_cache, prompt_version
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # Fetch from environment variable
 
 if not OPENAI_API_KEY:
@@ -13,8 +14,10 @@ client = openai.OpenAI()
 
 # Base directories
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-FINETUNING_DIR = "/Users/ayushsiddhant/Desktop/CoachLoop/coachloop/finetuning_data"
-INDEX_DIR = os.path.join(BASE_DIR, "indexes")
+FINETUNING_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+
+CHAT_MODEL = "gpt-4"
+FALLBACK_RESPONSE = "I'm experiencing difficulties. Please try again later."
 
 # Tone file paths
 TONE_FILES = {
@@ -22,14 +25,13 @@ TONE_FILES = {
     "virtual_trainer": os.path.join(FINETUNING_DIR, "virtual_trainer/agent_training", "tone_virtual_trainer.json"),
 }
 
-# Metadata files
-METADATA_FILES = {
-    # "virtual_coach": os.path.join(FINETUNING_DIR, "virtual_coach", "metadata_virtual_coach.json"),
-    "virtual_trainer_negotiation": os.path.join(FINETUNING_DIR, "virtual_trainer/agent_training", "metadata_negotiation.json"),
-    "virtual_trainer_sales": os.path.join(FINETUNING_DIR, "virtual_trainer/agent_training", "metadata_sales.json"),
-    "virtual_trainer_presentation": os.path.join(FINETUNING_DIR, "virtual_trainer/agent_training", "metadata_presentation.json"),
-    "virtual_trainer_behavior": os.path.join(FINETUNING_DIR, "virtual_trainer/agent_training", "metadata_behavior.json"),
-    "virtual_trainer": os.path.join(FINETUNING_DIR, "virtual_trainer/agent_training", "metadata_virtual_trainer.json"),
+# Retriever agents (catalog names, or several joined with "+") behind each agent type
+RETRIEVAL_AGENTS = {
+    "virtual_trainer": "presentation+negotiation+behavior",
+    "virtual_trainer_negotiation": "negotiation",
+    "virtual_trainer_sales": "negotiation",
+    "virtual_trainer_presentation": "presentation",
+    "virtual_trainer_behavior": "behavior",
 }
 
 def load_json(file_path, description):
@@ -40,46 +42,16 @@ def load_json(file_path, description):
     with open(file_path, "r") as file:
         return json.load(file)
 
-def load_index(index_name):
-    """Load FAISS index safely from multiple possible locations."""
-    paths = [
-        os.path.join(INDEX_DIR, f"{index_name}.index"),
-        # os.path.join(INDEX_DIR, "virtual_coach_text", "faiss_index_vc_text.index"),
-        # os.path.join(INDEX_DIR, "virtual_coach_video", "faiss_index_vc_video.index")
-    ]
-    for path in paths:
-        if os.path.exists(path):
-            print(f"Loaded FAISS index from: {path}")
-            return faiss.read_index(path)
-    print(f"Warning: No valid FAISS index found for {index_name}")
-    return None
-
-def get_embedding(text):
-    """Generate an OpenAI embedding for a given text."""
+def retrieve_context(agent_type, user_query, top_k=5, budget=CONTEXT_TOKENS):
+    """Passages for the query from the corpora behind an agent type, packed into the prompt-token budget."""
+    agent = RETRIEVAL_AGENTS.get(agent_type, agent_type)
     try:
-        response = client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=[text]
-        )
-        return np.array(response.data[0].embedding, dtype=np.float32)
+        results = get_retriever().search(user_query, agent, k=top_k)
     except Exception as e:
-        print(f"Error: OpenAI Embedding API failed: {e}")
-        return np.random.rand(1536).astype("float32")  # Random fallback embedding
-
-def search_index(index, query_embedding, top_k=3):
-    """Search FAISS index and return top matches."""
-    if index is None:
+        # Usually the embedding API; the model can still answer without passages
+        print(f"Error: Retrieval failed: {e}")
         return []
-
-    expected_dim = index.d
-    actual_dim = query_embedding.shape[0]
-    
-    if actual_dim != expected_dim:
-        print(f"Resizing embedding: Expected {expected_dim}, got {actual_dim}. Adjusting...")
-        query_embedding = np.resize(query_embedding, expected_dim)
-    
-    distances, indices = index.search(np.array([query_embedding]), top_k)
-    return indices[0] if indices.size > 0 else []
+    return pack_context(user_query, results, budget)
 
 def load_tone(agent):
     """Load tone file for the selected agent."""
@@ -116,33 +88,58 @@ def call_openai(prompt, agent, tone_data):
     ]
     try:
         response = client.chat.completions.create(
-            model="gpt-4",
+            model=CHAT_MODEL,
             messages=messages
         )
         return response.choices[0].message.content
     except Exception as e:
         print(f"Error: OpenAI Chat API failed: {e}")
-        return "I'm experiencing difficulties. Please try again later."
+        return FALLBACK_RESPONSE
+
+def generate_response(user_id, agent_type, user_query, use_cache=True):
+    """Generate AI response based on user query and selected agent.
 
-def generate_response(user_id, agent_type, user_query):
-    """Generate AI response based on user query and selected agent."""
+    A query close enough to one this agent already answered (with the same tone and model)
+    gets that answer back without a chat call; `use_cache=False` always asks the model.
+    """
     
     # Load necessary files
-    metadata = load_json(METADATA_FILES.get(agent_type, ""), "Metadata")
-    index = load_index(agent_type)
     tone_data = load_tone(agent_type)
 
-    if metadata is None or index is None:
-        return "❌ Missing necessary files. Unable to generate a response."
-
-    # Process the user query
-    query_embedding = get_embedding(user_query)
-    top_indices = search_index(index, query_embedding, top_k=3)
-
-    context_prompt = metadata[top_indices[0]] if top_indices.size > 0 and top_indices[0] < len(metadata) else user_query
-    ai_response = call_openai(context_prompt, agent_type, tone_data)
+    # Semantic answer cache, scoped to the agent and the prompt that shapes its answers
+    cache = get_response_cache()
+    version = prompt_version(build_system_message(agent_type, tone_data), CHAT_MODEL)
+    use_cache = use_cache and RESPONSE_CACHE
+    if use_cache:
+        try:
+            query_embedding = get_query_embedding(user_query)
+        except Exception as e:
+            # The cache is an optimisation; without an embedding, answer the slow way
+            print(f"Error: Query embedding failed, skipping the answer cache: {e}")
+            use_cache = False
+    if use_cache:
+        cached = cache.get(agent_type, version, user_query, query_embedding)
+        if cached is not None:
+            return cached
+    else:
+        cache.bypass()
+
+    # Retrieve the closest passages from the agent's (already loaded) indexes
+    context = retrieve_context(agent_type, user_query)
+    if not context:
+        print(f"Warning: No passages retrieved for {agent_type}; answering without context")
+
+    ai_response = call_openai(format_prompt(user_query, context), agent_type, tone_data)
+    if use_cache and ai_response != FALLBACK_RESPONSE:
+        cache.put(agent_type, version, user_query, query_embedding, ai_response)
 
     return ai_response  
 
+def get_response(role, query, use_cache=True):
+    """Response for the backend API, where the role picks the agent."""
+    return generate_response(None, role, query, use_cache=use_cache)
+
 if __name__ == "__main__":
-    generate_response()
+    import sys
+
+    print(get_response(sys.argv[1], " ".join(sys.argv[2:])))
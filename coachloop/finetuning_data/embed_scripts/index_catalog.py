@@ -0,0 +1,101 @@
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Folder holding every index; builds write here and the servers read from here
+INDEX_ROOT = os.getenv("FAISS_INDEX_ROOT", os.path.join(BASE_DIR, "indexes"))
+
+# Every corpus we index: the agent it serves, what kind of source it came from, where its
+# cleaned text lives (relative to finetuning_data/) and the folder/suffix of its index files.
+# PDF corpora also name their source PDF folder and the text_cleaning rule set for its text,
+# for builds that read the PDFs directly (INDEX_FROM_PDF=1).
+# The order is also the partition order of the combined index.
+CATALOG = {
+    "presentation": {
+        "agent": "presentation",
+        "source": "pdf",
+        "text_folder": "virtual_trainer/agent_training/presentation_agent/cleaned_text",
+        "pdf_folder": "virtual_trainer/agent_training/presentation_agent",
+        "rules": "ascii",
+        "index_dir": "vt_presentation",
+        "suffix": "vt_presentation",
+    },
+    "negotiation": {
+        "agent": "negotiation",
+        "source": "pdf",
+        "text_folder": "virtual_trainer/agent_training/negotiation_sales_agent/cleaned_text",
+        "pdf_folder": "virtual_trainer/agent_training/negotiation_sales_agent",
+        "rules": "ascii",
+        "index_dir": "vt_negotiation_sales",
+        "suffix": "vt_negotiation_sales",
+    },
+    "behavior": {
+        "agent": "behavior",
+        "source": "pdf",
+        "text_folder": "virtual_trainer/agent_training/behavior_training/cleaned_text",
+        "pdf_folder": "virtual_trainer/agent_training/behavior_training/pdfs",
+        "rules": "pdf",
+        "index_dir": "vt_behavior_training",
+        "suffix": "vt_behavior_training",
+    },
+    "virtual_coach_text": {
+        "agent": "virtual_coach",
+        "source": "pdf",
+        "text_folder": "virtual_coach/cleaned_text",
+        "pdf_folder": "virtual_coach/supporting_pdfs",
+        "rules": "pdf",
+        "index_dir": "virtual_coach_text",
+        "suffix": "vc_text",
+    },
+    "virtual_coach_video": {
+        "agent": "virtual_coach",
+        "source": "video",
+        "text_folder": "virtual_coach/cleaned_video",
+        "index_dir": "virtual_coach_video",
+        "suffix": "vc_video",
+    },
+}
+
+# Older names still used by the build scripts
+ALIASES = {
+    "negotiation_sales": "negotiation",
+    "behavior_training": "behavior",
+    "text": "virtual_coach_text",
+    "video": "virtual_coach_video",
+}
+
+# The combined index over every corpus lives beside the per-corpus ones
+COMBINED = {"index_dir": "combined", "suffix": "combined"}
+
+
+def resolve_name(name):
+    """Catalog key for a corpus name or one of its aliases, or None if it is unknown."""
+    name = ALIASES.get(name, name)
+    return name if name in CATALOG else None
+
+
+def index_paths(entry, root=INDEX_ROOT):
+    """Paths of every file an index build writes, for a catalog entry (or COMBINED)."""
+    folder = os.path.join(root, entry["index_dir"])
+    suffix = entry["suffix"]
+    return {
+        "dir": folder,
+        "index": os.path.join(folder, f"faiss_index_{suffix}.index"),
+        "metadata": os.path.join(folder, f"metadata_{suffix}.meta"),
+        "legacy_metadata": os.path.join(folder, f"metadata_{suffix}.npy"),
+        "export": os.path.join(folder, f"embeddings_{suffix}"),
+        "csv": os.path.join(folder, f"embeddings_{suffix}.csv"),
+        "manifest": os.path.join(folder, f"manifest_{suffix}.json"),
+        "lexical": os.path.join(folder, f"lexical_{suffix}.bm25"),
+    }
+
+
+def select_partitions(names=None, agents=None, sources=None):
+    """Catalog keys matching every given filter; no filters selects all of them."""
+    names = None if names is None else {resolve_name(name) or name for name in names}
+    return [
+        key for key, entry in CATALOG.items()
+        if (names is None or key in names)
+        and (agents is None or entry["agent"] in agents)
+        and (sources is None or entry["source"] in sources)
+    ]
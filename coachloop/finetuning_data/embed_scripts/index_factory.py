@@ -0,0 +1,214 @@
+import math
+import os
+
+import faiss
+import numpy as np
+
+from index_manifest import load_manifest, manifest_path_for_index
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw")
+
+# Vector codecs: raw float32, float16 / int8 scalar quantization, or product quantization
+CODECS = ("none", "fp16", "sq8", "pq")
+
+# Below this many vectors an exact flat index is both fast enough and smaller
+ANN_MIN_VECTORS = int(os.getenv("FAISS_ANN_MIN_VECTORS", 5000))
+
+# IVF: points sampled per centroid for training, and the share of lists probed per query
+IVF_TRAINING_POINTS_PER_LIST = 64
+IVF_NPROBE_FRACTION = 1 / 16
+
+# HNSW graph settings
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Trained codecs (SQ8 ranges, PQ codebooks, PCA) use at most this many sampled vectors
+CODEC_TRAINING_POINTS = 20000
+
+# PQ sub-quantizers default to one per 4 dimensions (16x smaller than float32 at 8 bits)
+PQ_DIMS_PER_SUBQUANTIZER = 4
+PQ_M = int(os.getenv("FAISS_PQ_M", 0))
+
+TRAINING_SEED = 1234
+
+# Serve indexes memory-mapped from disk, so worker processes share one page-cache copy (0 reads them into the heap)
+FAISS_MMAP = os.getenv("FAISS_MMAP", "1") != "0"
+
+
+def _pq_settings(dimension, count):
+    """Sub-quantizer count dividing `dimension`, and code size that `count` vectors can train."""
+    m = PQ_M or max(1, dimension // PQ_DIMS_PER_SUBQUANTIZER)
+    while dimension % m:
+        m -= 1
+    # 8-bit codebooks need ~39 points per centroid; small corpora use 4-bit codes instead
+    nbits = 8 if count >= 256 * 39 else 4
+    return m, nbits
+
+
+def choose_index_config(index_type, count, dimension, codec="none", pca_dim=None):
+    """Pick the index structure, codec and their build/search settings for `count` vectors."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Use one of: {', '.join(INDEX_TYPES)}")
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}'. Use one of: {', '.join(CODECS)}")
+
+    if index_type != "flat" and count < ANN_MIN_VECTORS:
+        index_type = "flat"
+    config = {"type": index_type, "codec": codec}
+
+    # PCA needs at least as many training vectors as output dimensions
+    if pca_dim and pca_dim < dimension and count >= pca_dim:
+        config["pca_dim"] = pca_dim
+        dimension = pca_dim
+
+    if codec == "none":
+        codec_key = "Flat"
+    elif codec == "fp16":
+        codec_key = "SQfp16"
+    elif codec == "sq8":
+        codec_key = "SQ8"
+    else:
+        config["pq_m"], config["pq_nbits"] = _pq_settings(dimension, count)
+        codec_key = f"PQ{config['pq_m']}x{config['pq_nbits']}"
+
+    pca_key = f"PCA{config['pca_dim']}," if "pca_dim" in config else ""
+    training_points = CODEC_TRAINING_POINTS if codec in ("sq8", "pq") or pca_key else 0
+
+    if index_type == "ivf_flat":
+        nlist = max(1, min(int(4 * math.sqrt(count)), count // 39))
+        config.update({"nlist": nlist, "nprobe": max(1, int(nlist * IVF_NPROBE_FRACTION))})
+        training_points = max(training_points, nlist * IVF_TRAINING_POINTS_PER_LIST)
+        # IVF keeps our IDs itself, so it needs no IDMap wrapper
+        config["factory"] = f"{pca_key}IVF{nlist},{codec_key}"
+    elif index_type == "hnsw":
+        config.update({"M": HNSW_M, "efConstruction": HNSW_EF_CONSTRUCTION, "efSearch": HNSW_EF_SEARCH})
+        config["factory"] = f"IDMap2,{pca_key}HNSW{HNSW_M}_{codec_key}"
+    else:
+        config["factory"] = f"IDMap2,{pca_key}{codec_key}"
+
+    config["training_points"] = min(count, training_points)
+    return config
+
+
+def same_structure(config, other):
+    """True if an index built with `other` can be patched in place to match `config`."""
+    keys = ("type", "codec", "pca_dim")
+    return all(config.get(key) == other.get(key) for key in keys)
+
+
+def select_training_sample(vectors, count, seed=TRAINING_SEED):
+    """Uniform random sample of rows, so trained structures follow the whole corpus rather than its first files."""
+    if count >= len(vectors):
+        return vectors
+    rows = np.sort(np.random.default_rng(seed).choice(len(vectors), size=count, replace=False))
+    return vectors[rows]
+
+
+def _find_hnsw(index):
+    """Unwrap IDMap / PCA layers down to the HNSW index, if there is one."""
+    while True:
+        index = faiss.downcast_index(index)
+        if isinstance(index, faiss.IndexHNSW):
+            return index
+        if isinstance(index, (faiss.IndexIDMap, faiss.IndexPreTransform)):
+            index = index.index
+        else:
+            return None
+
+
+def new_index(dimension, config):
+    """Empty, untrained index for a config."""
+    index = faiss.index_factory(dimension, config["factory"])
+    hnsw = _find_hnsw(index)
+    if hnsw is not None:
+        hnsw.hnsw.efConstruction = config["efConstruction"]
+    return index
+
+
+def train_index(index, sample):
+    """Train on a sample of the vectors (if the index needs it), before any are added."""
+    if not index.is_trained:
+        index.train(sample)
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # The hashtable lets IVF remove and reconstruct by our (sparse) IDs
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+
+def build_index(vectors, ids, config):
+    """Build an index from a config that returns our vector IDs from search()."""
+    index = new_index(vectors.shape[1], config)
+    train_index(index, select_training_sample(vectors, config["training_points"] or len(vectors)))
+    index.add_with_ids(vectors, ids)
+    apply_search_params(index, config)
+    return index
+
+
+def supports_removal(config):
+    """HNSW graphs cannot drop vectors, so those indexes are rebuilt instead."""
+    return config.get("type") != "hnsw"
+
+
+def apply_search_params(index, config):
+    """Set nprobe / efSearch from a saved index config."""
+    params = faiss.ParameterSpace()
+    if "nprobe" in config:
+        params.set_index_parameter(index, "nprobe", config["nprobe"])
+    if "efSearch" in config:
+        params.set_index_parameter(index, "efSearch", config["efSearch"])
+
+
+def search_parameters(config, selector=None):
+    """Per-query search settings (the saved nprobe / efSearch), optionally restricted to an ID selector.
+
+    None when there is nothing to set: flat PQ indexes reject any search parameters.
+    """
+    if selector is None and "nprobe" not in config and "efSearch" not in config:
+        return None
+    if "nprobe" in config:
+        params = faiss.SearchParametersIVF(nprobe=config["nprobe"])
+    elif "efSearch" in config:
+        params = faiss.SearchParametersHNSW(efSearch=config["efSearch"])
+    else:
+        params = faiss.SearchParameters()
+    if selector is not None:
+        params.sel = selector
+    return params
+
+
+def mmap_flags(config):
+    """IVF inverted lists map with IO_FLAG_MMAP; flat / SQ / PQ code arrays (HNSW storage too) with IO_FLAG_MMAP_IFC.
+
+    0 (read into memory) when this FAISS build lacks the flag; IO_FLAG_MMAP_IFC only exists in recent releases.
+    """
+    flag = getattr(faiss, "IO_FLAG_MMAP" if config.get("type") == "ivf_flat" else "IO_FLAG_MMAP_IFC", None)
+    if flag is None:
+        return 0
+    return flag | faiss.IO_FLAG_READ_ONLY
+
+
+def write_index(index, index_path):
+    """Write through a temporary file, so processes that have the old file mapped keep a valid copy."""
+    tmp_path = f"{index_path}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, index_path)
+
+
+def read_index(index_path, mmap=FAISS_MMAP):
+    """Read an index for searching and apply the search settings saved in its manifest, if any.
+
+    With `mmap` the vector data stays in the page cache rather than this process's heap,
+    and the index is read-only.
+    """
+    manifest = load_manifest(manifest_path_for_index(index_path))
+    config = manifest.get("index", {}) if manifest is not None else {}
+    try:
+        index = faiss.read_index(index_path, mmap_flags(config) if mmap else 0)
+    except RuntimeError:
+        # Older files or structures without mmap support are read into memory instead
+        index = faiss.read_index(index_path)
+    if config:
+        apply_search_params(index, config)
+    return index
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+# Also hash the index and metadata files when validating a manifest (1). Off by default: hashing reads every page
+# that memory-mapped loading leaves on disk, so loads only compare file sizes, vector count and dimension
+VERIFY_CHECKSUMS = os.getenv("FAISS_VERIFY_CHECKSUMS", "0") == "1"
+
+# Refuse to serve indexes built before manifests recorded their files (1), rather than only warning
+REQUIRE_MANIFEST = os.getenv("FAISS_REQUIRE_MANIFEST", "0") == "1"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def new_manifest(embedding_model, chunker, embedding_backend=None):
+    """Empty manifest for an index that has not been built yet."""
+    return {
+        "version": MANIFEST_VERSION,
+        "embedding_model": embedding_model,
+        "embedding_backend": embedding_backend,
+        "chunker": chunker,
+        "next_id": 0,
+        "files": {},
+    }
+
+
+def load_manifest(path):
+    """Load a manifest, or None if it is missing or from an older format."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(path, manifest):
+    # Write to a temporary file first so a crash never leaves half a manifest behind
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def list_source_files(folder, extensions=(".txt",)):
+    """Map every source file in `folder` to its content hash."""
+    return {
+        filename: file_sha256(os.path.join(folder, filename))
+        for filename in sorted(os.listdir(folder))
+        if filename.lower().endswith(extensions) and os.path.isfile(os.path.join(folder, filename))
+    }
+
+
+def diff_sources(manifest, source_hashes):
+    """Compare the manifest with the current source files.
+
+    Returns (added, changed, removed) lists of filenames. Files whose last build
+    was incomplete are recorded with a null hash, so they always count as changed.
+    """
+    indexed = manifest["files"]
+    added = [name for name in source_hashes if name not in indexed]
+    changed = [name for name in source_hashes if name in indexed and indexed[name]["sha256"] != source_hashes[name]]
+    removed = [name for name in indexed if name not in source_hashes]
+    return added, changed, removed
+
+
+def file_ids(manifest, filename):
+    """The contiguous range of vector IDs assigned to one source file."""
+    start, end = manifest["files"][filename]["ids"]
+    return range(start, end)
+
+
+def describe_build(index, index_path, metadata_path):
+    """What a finished build wrote, so loaders can check the files without deserialising the index."""
+    return {
+        "vectors": int(index.ntotal),
+        "dimension": int(index.d),
+        "index_bytes": os.path.getsize(index_path),
+        "index_sha256": file_sha256(index_path),
+        "metadata_bytes": os.path.getsize(metadata_path),
+        "metadata_sha256": file_sha256(metadata_path),
+    }
+
+
+def validate_manifest(manifest, index_path, metadata_path, embedding_model=None, dimension=None, checksums=VERIFY_CHECKSUMS):
+    """Problems that make an index unsafe to serve; an empty list means the files match their manifest.
+
+    `embedding_model` and `dimension` are what the caller will embed queries with, if known.
+    A manifest without a "build" section (older builds) can only be checked for its model.
+    """
+    problems = []
+    if embedding_model is not None and manifest.get("embedding_model") != embedding_model:
+        problems.append(f"built with {manifest.get('embedding_model')}, queried with {embedding_model}")
+
+    build = manifest.get("build")
+    if build is None:
+        return problems
+    if dimension is not None and build["dimension"] != dimension:
+        problems.append(f"index dimension {build['dimension']}, query dimension {dimension}")
+
+    for kind, path in (("index", index_path), ("metadata", metadata_path)):
+        if not os.path.exists(path):
+            problems.append(f"{kind} file missing: {path}")
+        elif os.path.getsize(path) != build[f"{kind}_bytes"]:
+            problems.append(f"{kind} file is {os.path.getsize(path)} bytes, manifest says {build[f'{kind}_bytes']}")
+        elif checksums and file_sha256(path) != build[f"{kind}_sha256"]:
+            problems.append(f"{kind} file checksum does not match the manifest")
+    return problems
+
+
+def check_index_files(manifest_path, index_path, metadata_path, embedding_model=None, dimension=None, checksums=VERIFY_CHECKSUMS):
+    """(manifest, problems) for an index about to be loaded; the manifest is None for builds that have none.
+
+    Builds without a manifest, or with one that predates build checks, only count as a
+    problem under FAISS_REQUIRE_MANIFEST=1.
+    """
+    manifest = load_manifest(manifest_path)
+    if manifest is None:
+        return None, ["no manifest"] if REQUIRE_MANIFEST else []
+    problems = validate_manifest(manifest, index_path, metadata_path, embedding_model, dimension, checksums)
+    if "build" not in manifest and REQUIRE_MANIFEST:
+        problems.append("manifest predates build checks")
+    return manifest, problems
+
+
+def check_loaded_index(manifest, index, dimension=None):
+    """Problems with an index just read (memory-mapped, so only its header was touched) against its manifest.
+
+    `dimension` is what the caller embeds queries with; it is checked even for builds without a manifest.
+    """
+    problems = []
+    if dimension is not None and index.d != dimension:
+        problems.append(f"index dimension {index.d}, query dimension {dimension}")
+    build = (manifest or {}).get("build")
+    if build is None:
+        return problems
+    if index.ntotal != build["vectors"]:
+        problems.append(f"index holds {index.ntotal} vectors, manifest says {build['vectors']}")
+    if index.d != build["dimension"]:
+        problems.append(f"index dimension {index.d}, manifest says {build['dimension']}")
+    return problems
+
+
+def manifest_path_for_index(index_path):
+    """indexes/<dir>/faiss_index_<suffix>.index -> indexes/<dir>/manifest_<suffix>.json"""
+    folder, filename = os.path.split(index_path)
+    suffix = os.path.splitext(filename)[0].replace("faiss_index_", "", 1)
+    return os.path.join(folder, f"manifest_{suffix}.json")
@@ -1,14 +1,24 @@
+import argparse
 import faiss
-import numpy as np
 import os
+from metadata_store import load_metadata_store, resolve_metadata_path
+from index_catalog import CATALOG, COMBINED, index_paths, resolve_name
+from index_manifest import check_index_files
 
-# Paths to your FAISS index and metadata files
-INDEX_FILE = "indexes/vt_behavior/faiss_index_vt_behavior.index"
-METADATA_FILE = "indexes/vt_behavior/metadata_vt_behavior.npy"
+parser = argparse.ArgumentParser(description="Check a FAISS index against its manifest and show what it holds.")
+parser.add_argument("name", nargs="?", default="behavior", help="Catalog name of the index, or 'combined'")
+parser.add_argument("--load", action="store_true", help="Also load the index and metadata and show the first entries")
+args = parser.parse_args()
 
-# Get absolute paths for debugging
-abs_index_file = os.path.abspath(INDEX_FILE)
-abs_metadata_file = os.path.abspath(METADATA_FILE)
+entry = COMBINED if args.name == "combined" else CATALOG.get(resolve_name(args.name))
+if entry is None:
+    print(f"⚠️ ERROR: Unknown index '{args.name}'. Use one of: {', '.join(CATALOG)}, combined")
+    exit()
+
+# Paths to the FAISS index, metadata and manifest files
+paths = index_paths(entry)
+abs_index_file = paths["index"]
+abs_metadata_file = resolve_metadata_path(paths["metadata"]) or paths["metadata"]
 
 print(f"🔍 Checking FAISS Index Path: {abs_index_file}")
 print(f"🔍 Checking Metadata Path: {abs_metadata_file}")
@@ -21,24 +31,46 @@ if not os.path.exists(abs_metadata_file):
     print(f"⚠️ ERROR: Metadata file not found: {abs_metadata_file}")
     exit()
 
-# Load FAISS index
-print("\n📥 Loading FAISS Index...")
-index = faiss.read_index(abs_index_file)
+# Validate the manifest, hashing both files; the index itself is not read for this
+manifest, problems = check_index_files(paths["manifest"], abs_index_file, abs_metadata_file, checksums=True)
+if manifest is None or "build" not in manifest:
+    print("\n⚠️ No build manifest for this index; use --load to read its details from the index itself.")
+else:
+    build = manifest["build"]
+    print("\n✅ Manifest Found!")
+    print(f"📌 Number of Vectors: {build['vectors']}")
+    print(f"📌 Vector Dimension: {build['dimension']}")
+    print(f"📌 Embedding Model: {manifest['embedding_model']}")
+    if manifest.get("embedding_backend"):
+        print(f"📌 Embedding Backend: {manifest['embedding_backend']['name']} ({manifest['embedding_backend']['dimension']} dimensions)")
+    print(f"📌 Index Type: {manifest['index'].get('factory', manifest['index'].get('type'))}")
+    if "chunker" in manifest:
+        print(f"📌 Chunker: {manifest['chunker']}")
+for problem in problems:
+    print(f"⚠️ ERROR: {problem}")
+if not problems and manifest is not None and "build" in manifest:
+    print("✅ Index and metadata files match their checksums")
+
+if args.load:
+    # Load FAISS index
+    print("\n📥 Loading FAISS Index...")
+    index = faiss.read_index(abs_index_file)
 
-# Print index details
-print("\n✅ FAISS Index Loaded Successfully!")
-print(f"📌 Number of Vectors: {index.ntotal}")
-print(f"📌 Vector Dimension: {index.d}")
+    # Print index details
+    print("\n✅ FAISS Index Loaded Successfully!")
+    print(f"📌 Number of Vectors: {index.ntotal}")
+    print(f"📌 Vector Dimension: {index.d}")
 
-# Load metadata
-print("\n📥 Loading Metadata...")
-metadata = np.load(abs_metadata_file, allow_pickle=True)
+    # Load metadata
+    print("\n📥 Loading Metadata...")
+    metadata = load_metadata_store(abs_metadata_file)
 
-print("\n✅ Metadata Loaded Successfully!")
-print(f"📌 Metadata Type: {type(metadata)}")
-print(f"📌 Metadata Length: {len(metadata)}")
+    print("\n✅ Metadata Loaded Successfully!")
+    print(f"📌 Metadata Type: {type(metadata)}")
+    print(f"📌 Metadata Length: {len(metadata)}")
 
-# Display first 5 metadata entries
-print("\n📜 First 5 Metadata Entries:")
-for i, entry in enumerate(metadata[:5]):
-    print(f"{i+1}. {entry}")
+    # Display first 5 metadata entries
+    print("\n📜 First 5 Metadata Entries:")
+    for i in range(min(5, len(metadata))):
+        entry = metadata[i]
+        print(f"{i+1}. {entry}")
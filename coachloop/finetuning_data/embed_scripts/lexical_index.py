@@ -0,0 +1,167 @@
+import json
+import mmap
+import os
+import re
+import struct
+from collections import Counter
+
+import numpy as np
+
+# BM25 settings
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# File layout (all integers little-endian):
+#   header      magic, version, document and term counts, average document length and section offsets
+#   vocabulary  JSON list of terms, sorted
+#   term_starts int64[terms + 1]; term t's postings are [term_starts[t], term_starts[t + 1])
+#   doc_ids     int32[postings]; row IDs (the same IDs as the FAISS index and metadata), ascending per term
+#   tfs         uint16[postings]; term frequency in that row
+#   doc_lengths int32[documents]; terms per row, 0 for removed rows
+MAGIC = b"CLBM25\x00\x01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQdQQQQQQ")
+LEXICAL_EXTENSION = ".bm25"
+
+TOKEN = re.compile(r"\w+")
+
+# Words too common to say anything about a chunk; dropping them keeps postings short
+STOP_WORDS = frozenset("""
+a about after all also an and any are as at be because been but by can could did do does for from had has have he
+her his how i if in into is it its just me my no not of on or our out she so than that the their them then there
+these they this to up us was we were what when where which who why will with would you your
+""".split())
+
+
+def tokenize(text):
+    """Lower-cased word tokens without stop words, for both documents and queries."""
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def _align(f, boundary=8):
+    f.write(b"\0" * (-f.tell() % boundary))
+
+
+def write_lexical_index(path, rows):
+    """Write a BM25 index over metadata rows (dicts or None); row i gets ID i, like in the FAISS index."""
+    postings = {}
+    doc_lengths = []
+    for i, meta in enumerate(rows):
+        counts = Counter(tokenize(meta["text"])) if meta is not None else Counter()
+        doc_lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((i, min(tf, 0xFFFF)))
+
+    vocabulary = sorted(postings)
+    term_starts = np.zeros(len(vocabulary) + 1, dtype="<i8")
+    term_starts[1:] = np.cumsum([len(postings[term]) for term in vocabulary])
+    doc_ids = np.fromiter((i for term in vocabulary for i, _ in postings[term]), dtype="<i4", count=int(term_starts[-1]))
+    tfs = np.fromiter((tf for term in vocabulary for _, tf in postings[term]), dtype="<u2", count=int(term_starts[-1]))
+    doc_lengths = np.asarray(doc_lengths, dtype="<i4")
+    live = np.count_nonzero(doc_lengths)
+    avg_length = float(doc_lengths.sum() / live) if live else 0.0
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        vocabulary_start = f.tell()
+        vocabulary_bytes = json.dumps(vocabulary, ensure_ascii=False).encode("utf-8")
+        f.write(vocabulary_bytes)
+        starts = []
+        for array in (term_starts, doc_ids, tfs, doc_lengths):
+            _align(f)
+            starts.append(f.tell())
+            f.write(array.tobytes())
+        f.seek(0)
+        f.write(HEADER.pack(
+            MAGIC, VERSION, 0, len(doc_lengths), len(vocabulary), avg_length,
+            vocabulary_start, len(vocabulary_bytes), *starts,
+        ))
+    os.replace(tmp_path, path)
+
+
+# Read-only, memory-mapped BM25 index over one corpus's chunks
+class LexicalIndex:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, _, docs, terms, self.avg_length, vocabulary_start, vocabulary_len,
+         term_starts_start, doc_ids_start, tfs_start, doc_lengths_start) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a lexical index: {path}")
+
+        vocabulary = json.loads(self.mm[vocabulary_start:vocabulary_start + vocabulary_len].decode("utf-8"))
+        self.terms = {term: t for t, term in enumerate(vocabulary)}
+        self.term_starts = np.frombuffer(self.mm, dtype="<i8", count=terms + 1, offset=term_starts_start)
+        postings = int(self.term_starts[-1])
+        self.doc_ids = np.frombuffer(self.mm, dtype="<i4", count=postings, offset=doc_ids_start)
+        self.tfs = np.frombuffer(self.mm, dtype="<u2", count=postings, offset=tfs_start)
+        self.doc_lengths = np.frombuffer(self.mm, dtype="<i4", count=docs, offset=doc_lengths_start)
+        self.live = int(np.count_nonzero(self.doc_lengths))
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def document_frequency(self, term):
+        t = self.terms.get(term)
+        return 0 if t is None else int(self.term_starts[t + 1] - self.term_starts[t])
+
+    def search(self, query, k=10):
+        """(row IDs, BM25 scores) of the top-k rows for a query, best first; rows sharing no term are left out."""
+        scores = np.zeros(len(self.doc_lengths), dtype=np.float32)
+        norms = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths / (self.avg_length or 1.0))
+        for term in set(tokenize(query)):
+            t = self.terms.get(term)
+            if t is None:
+                continue
+            start, end = int(self.term_starts[t]), int(self.term_starts[t + 1])
+            ids, tfs = self.doc_ids[start:end], self.tfs[start:end].astype(np.float32)
+            idf = np.log(1 + (self.live - (end - start) + 0.5) / ((end - start) + 0.5))
+            scores[ids] += idf * tfs * (BM25_K1 + 1) / (tfs + norms[ids])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return matched, scores[matched]
+
+    def close(self):
+        self.term_starts = self.doc_ids = self.tfs = self.doc_lengths = None
+        try:
+            self.mm.close()
+        except BufferError:
+            pass
+
+
+def load_lexical_index(path, rows=None):
+    """Open a lexical index, or None if it is missing or was built for a different number of rows."""
+    if not os.path.exists(path):
+        return None
+    index = LexicalIndex(path)
+    if rows is not None and len(index) != rows:
+        print(f"⚠️ Ignoring {path}: it covers {len(index)} rows, the metadata has {rows}. Rebuild it with lexical_index.py.")
+        index.close()
+        return None
+    return index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from index_catalog import CATALOG, index_paths, resolve_name
+    from metadata_store import load_metadata_store
+
+    parser = argparse.ArgumentParser(description="Build the BM25 index of already built FAISS indexes from their metadata.")
+    parser.add_argument("names", nargs="*", default=list(CATALOG), help="Indexes to cover (default: all)")
+    args = parser.parse_args()
+
+    for name in args.names:
+        paths = index_paths(CATALOG[resolve_name(name)])
+        metadata = load_metadata_store(paths["metadata"])
+        if metadata is None:
+            print(f"⚠️ Skipping {name}: it has not been built yet.")
+            continue
+        write_lexical_index(paths["lexical"], metadata)
+        print(f"✅ Lexical index saved at: {paths['lexical']} ({os.path.getsize(paths['lexical']) / 1024:,.1f} KiB)")
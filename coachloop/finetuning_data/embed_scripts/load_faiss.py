@@ -1,48 +1,66 @@
 import os
-import faiss
-import numpy as np
+import threading
 import logging
+from collections import OrderedDict
+from index_factory import read_index
+from metadata_store import load_metadata_store, resolve_metadata_path
+from index_catalog import CATALOG, INDEX_ROOT, index_paths, resolve_name
+from index_manifest import check_index_files, check_loaded_index, load_manifest
 
 # 🔹 Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# 🔹 Define paths for FAISS indexes
-BASE_PATH = "/Users/ayushsiddhant/Desktop/CoachLoop/coachloop/finetuning_data/embed_scripts/indexes"
+# 🔹 Memory budget for loaded indexes and their metadata (0 keeps every index once loaded)
+INDEX_MEMORY_BUDGET = int(os.getenv("FAISS_INDEX_MEMORY_BUDGET", 0))
 
-INDEXES = {
-    "presentation": "vt_presentation_agent",
-    "negotiation": "vt_negotiation_sales_agent",
-    "behavior": "vt_behavior_training",
-    "virtual_coach_text": "virtual_coach_text",
-    "virtual_coach_video": "virtual_coach_video",
-}
 
 # 🔹 Function to load FAISS index and metadata
-def load_faiss_index(index_name):
-    """Loads a FAISS index and its metadata, with error handling."""
-    
+def load_faiss_index(index_name, root=INDEX_ROOT, embedding_model=None, dimension=None):
+    """Loads a FAISS index and its metadata, with error handling.
+
+    The files are checked against the build manifest first, so a mismatched index / metadata
+    pair, or an index built with a different embedding model than `embedding_model`, is refused
+    before anything is deserialised. An index whose dimension is not `dimension` (the query
+    embeddings') is refused as soon as it is read, manifest or not.
+    """
+
     logging.info(f"🔄 Attempting to load FAISS index for: {index_name}...")
 
-    index_path = os.path.join(BASE_PATH, INDEXES[index_name], f"faiss_index_{INDEXES[index_name]}.index")
-    metadata_path = os.path.join(BASE_PATH, INDEXES[index_name], f"metadata_{INDEXES[index_name]}.npy")
+    paths = index_paths(CATALOG[index_name], root)
+    index_path = paths["index"]
+    metadata_path = resolve_metadata_path(paths["metadata"])
 
     # 🔹 Check if files exist before loading
     if not os.path.exists(index_path):
         logging.warning(f"⚠️ FAISS index file not found: {index_path}")
         return None, None
-    
-    if not os.path.exists(metadata_path):
-        logging.warning(f"⚠️ Metadata file not found: {metadata_path}")
+
+    if metadata_path is None:
+        logging.warning(f"⚠️ Metadata file not found for: {index_name}")
+        return None, None
+
+    # 🔹 Validate the manifest (model and file sizes; checksums under FAISS_VERIFY_CHECKSUMS=1) without loading the index
+    manifest, problems = check_index_files(paths["manifest"], index_path, metadata_path, embedding_model, dimension)
+    if problems:
+        logging.error(f"❌ Refusing to load FAISS index for {index_name}: {'; '.join(problems)}")
         return None, None
+    if manifest is None or "build" not in manifest:
+        logging.warning(f"⚠️ {index_name} has no build manifest; its files cannot be checked before loading")
+    else:
+        logging.info(f"🧾 Manifest OK: {manifest['build']['vectors']} vectors, Dimension: {manifest['build']['dimension']}, Model: {manifest['embedding_model']}")
 
     try:
         # 🔹 Load FAISS index
         logging.info(f"📥 Loading FAISS index from: {index_path}")
-        index = faiss.read_index(index_path)
-        
-        # 🔹 Load metadata (filenames or text chunks)
+        index = read_index(index_path)
+        problems = check_loaded_index(manifest, index, dimension)
+        if problems:
+            logging.error(f"❌ Refusing to load FAISS index for {index_name}: {'; '.join(problems)}")
+            return None, None
+
+        # 🔹 Load metadata (filenames or text chunks), memory-mapped when in .meta format
         logging.info(f"📥 Loading metadata from: {metadata_path}")
-        metadata = np.load(metadata_path, allow_pickle=True).tolist()
+        metadata = load_metadata_store(metadata_path)
 
         logging.info(f"✅ Successfully loaded FAISS index for {index_name}: {index.ntotal} vectors, Dimension: {index.d}")
         return index, metadata
@@ -51,23 +69,158 @@ def load_faiss_index(index_name):
         logging.error(f"❌ Error loading FAISS index for {index_name}: {e}")
         return None, None
 
-# 🔹 Load all FAISS indexes
-faiss_indexes = {}
-metadata_store = {}
-
-logging.info("\n🚀 **Starting FAISS Index Loading Process...**\n")
-
-for key in INDEXES.keys():
-    logging.info(f"\n---------------------------------------")
-    logging.info(f"📌 Processing FAISS index: {key.upper()}")
-    
-    index, metadata = load_faiss_index(key)
-    
-    if index is not None:
-        faiss_indexes[key] = index
-        metadata_store[key] = metadata
-        logging.info(f"✅ FAISS index for {key} is ready for use!\n")
-    else:
-        logging.warning(f"⚠️ Skipping {key} due to missing files or errors.\n")
 
-logging.info("\n🎉 **FAISS Index Loading Completed! Ready for Search.**")
+# 🔹 Loads indexes on first use and evicts the least recently used ones past a memory budget
+class IndexRegistry:
+    def __init__(self, root=INDEX_ROOT, memory_budget=INDEX_MEMORY_BUDGET):
+        self.root = root
+        self.memory_budget = memory_budget
+        self.entries = OrderedDict()  # name -> (index, metadata, size in bytes, embedding model), least recently used first
+        self.loading = {}  # name -> lock held while that index is being read, dropped once it is
+        self.missing = {}  # (name, embedding model, dimension) that could not be loaded -> file_signature() at the time
+        self.lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def file_signature(self, name):
+        """Modification times of an index's files; a failed load is retried once they change."""
+        paths = index_paths(CATALOG[name], self.root)
+        return tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in (paths["index"], paths["manifest"]))
+
+    def _failed(self, key, embedding_model, dimension):
+        """Whether this load already failed for these files; the caller holds the lock."""
+        failure = (key, embedding_model, dimension)
+        if failure not in self.missing:
+            return False
+        if self.missing[failure] == self.file_signature(key):
+            return True
+        del self.missing[failure]
+        return False
+
+    def size_of(self, name):
+        """Bytes an index and its metadata take once loaded; their file sizes are a close estimate."""
+        paths = index_paths(CATALOG[name], self.root)
+        metadata_path = resolve_metadata_path(paths["metadata"])
+        return sum(os.path.getsize(path) for path in (paths["index"], metadata_path) if path and os.path.exists(path))
+
+    def get(self, name, embedding_model=None, dimension=None):
+        """(index, metadata) for a corpus, loading it on first use; (None, None) if it is unknown, not built or invalid.
+
+        `embedding_model` and `dimension` are what the caller embeds queries with; an index built
+        with another model, or of another dimension, is refused.
+        """
+        key = resolve_name(name)
+        if key is None:
+            logging.warning(f"⚠️ Unknown FAISS index: {name}")
+            return None, None
+
+        with self.lock:
+            if key in self.entries:
+                return self._hit(key, embedding_model, dimension)
+            if self._failed(key, embedding_model, dimension):
+                return None, None
+            loading = self.loading.setdefault(key, threading.Lock())
+
+        # Only one thread reads a given index; the others wait for it rather than load a second copy
+        with loading:
+            try:
+                with self.lock:
+                    if key in self.entries:
+                        return self._hit(key, embedding_model, dimension)
+                    if self._failed(key, embedding_model, dimension):
+                        return None, None
+
+                signature = self.file_signature(key)
+                index, metadata = load_faiss_index(key, self.root, embedding_model, dimension)
+                if index is None:
+                    # Remember the failure for these files, so each query does not repeat the disk checks and the warning
+                    with self.lock:
+                        self.missing[(key, embedding_model, dimension)] = signature
+                    return None, None
+
+                with self.lock:
+                    manifest = load_manifest(index_paths(CATALOG[key], self.root)["manifest"]) or {}
+                    self.entries[key] = (index, metadata, self.size_of(key), manifest.get("embedding_model"))
+                    self.loads += 1
+                    self._evict(keep=key)
+            finally:
+                # Threads already waiting hold the lock object; later ones find the entry or the failure instead
+                with self.lock:
+                    if self.loading.get(key) is loading:
+                        del self.loading[key]
+        return index, metadata
+
+    def _hit(self, key, embedding_model, dimension=None):
+        """An already loaded index; the caller holds the lock."""
+        index, metadata, _, built_with = self.entries[key]
+        if embedding_model is not None and built_with is not None and embedding_model != built_with:
+            logging.error(f"❌ FAISS index {key} was built with {built_with}, not {embedding_model}")
+            return None, None
+        if dimension is not None and index.d != dimension:
+            logging.error(f"❌ FAISS index {key} has dimension {index.d}, queries have {dimension}")
+            return None, None
+        self.entries.move_to_end(key)
+        return index, metadata
+
+    def _evict(self, keep):
+        """Drop least recently used indexes until the loaded ones fit the budget (the newest always stays)."""
+        if not self.memory_budget:
+            return
+        while self.loaded_bytes() > self.memory_budget and len(self.entries) > 1:
+            name = next(iter(self.entries))
+            if name == keep:
+                break
+            # Searches already holding the index keep it alive until they finish
+            del self.entries[name]
+            self.evictions += 1
+            logging.info(f"♻️ Evicted FAISS index {name} to stay within the {self.memory_budget / 1024 ** 2:,.0f} MiB budget")
+
+    def loaded_bytes(self):
+        return sum(entry[2] for entry in self.entries.values())
+
+    def unload(self, name=None):
+        """Forget one loaded index (or all of them), e.g. after it has been rebuilt; failed ones are retried on next use."""
+        with self.lock:
+            if name is None:
+                self.entries.clear()
+                self.missing.clear()
+            else:
+                key = resolve_name(name)
+                self.entries.pop(key, None)
+                for failure in [failure for failure in self.missing if failure[0] == key]:
+                    del self.missing[failure]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "loaded": list(self.entries),
+                "missing": sorted({failure[0] for failure in self.missing}),
+                "bytes": self.loaded_bytes(),
+                "memory_budget": self.memory_budget,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_index_registry():
+    """Process-wide registry shared by every request."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = IndexRegistry()
+        return _default_registry
+
+
+if __name__ == "__main__":
+    # 🔹 Load every index once, e.g. to check that all of them open
+    registry = get_index_registry()
+    logging.info(f"\n🚀 **Loading FAISS indexes from {registry.root}...**\n")
+    for key in CATALOG:
+        index, _ = registry.get(key)
+        if index is None:
+            logging.warning(f"⚠️ Skipping {key} due to missing files or errors.\n")
+    logging.info(f"\n🎉 **FAISS Index Loading Completed!** {registry.stats()}")
@@ -1,23 +1,30 @@
 import os
+from dotenv import load_dotenv
+
+# Load environment variables first: the modules below read their settings (SESSION_BACKEND,
+# FAISS_INDEX_ROOT, EMBEDDING_BACKEND, OPENAI_MAX_CONCURRENCY, ...) when they are imported
+load_dotenv()
+
 from fastapi import FastAPI, HTTPException, UploadFile, File, Request
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
-from openai import OpenAI
-from dotenv import load_dotenv
 from io import BytesIO
-from virtual_coach_response import virtual_coach_response, bot
+from starlette.concurrency import run_in_threadpool
+from virtual_coach_response import virtual_coach_response
+from session_store import MAX_SESSION_ID_LENGTH, get_session_store, new_session_id
+from openai_client import get_async_client, get_openai_limit
 import soundfile as sf
 import logging
+from memory_report import format_memory, process_memory
+from retriever import RETRIEVER_MODE, RETRIEVER_TOP_K, get_retriever
+from query_cache import get_query_cache
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
-
 app = FastAPI()
 
 # Add CORS middleware
@@ -29,11 +36,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-if not client.api_key:
+# Initialize OpenAI client; async, so a slow completion, TTS or Whisper call only holds its own request
+if not os.getenv("OPENAI_API_KEY"):
     logger.error("OpenAI API key is missing")
     raise HTTPException(status_code=500, detail="OpenAI API key is missing")
+client = get_async_client()
+openai_limit = get_openai_limit()
+
+# Conversations live in the session store (SESSION_BACKEND), so any worker can serve any turn
+sessions = get_session_store()
+
+# Retriever keeps each agent's index resident across requests (RETRIEVER_WARM=1 loads them all now)
+retriever = get_retriever()
+
+logger.info(f"Worker memory at start-up: {format_memory(process_memory())}")
 
 # Pydantic models
 class Message(BaseModel):
@@ -42,20 +58,53 @@ class Message(BaseModel):
 
 class ChatRequest(BaseModel):
     user_input: str
-    conversation_history: List[Message]
-    current_step: int
+    # Omit to start a new session; the response carries its ID
+    session_id: Optional[str] = None
+    # Only read when the session is new, so clients that still send them pick up where they were
+    conversation_history: Optional[List[Message]] = None
+    current_step: Optional[int] = None
     use_voice_output: bool = False
 
 class ChatResponse(BaseModel):
+    session_id: str
     response: str
     conversation_history: List[Message]
     current_step: int
 
+class ResetRequest(BaseModel):
+    session_id: Optional[str] = None
+
+class SearchRequest(BaseModel):
+    query: str
+    agent: str
+    k: int = RETRIEVER_TOP_K
+    mode: str = RETRIEVER_MODE
+
+class SearchResult(BaseModel):
+    score: Optional[float]
+    agent: str
+    filename: Optional[str]
+    text: str
+    bm25: Optional[float] = None
+    rrf: Optional[float] = None
+
+class SearchResponse(BaseModel):
+    results: List[SearchResult]
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     logger.info("Health check requested")
-    return {"status": "healthy", "message": "FastAPI server is running"}
+    # Per-worker memory; with memory-mapped indexes it should stay flat as workers are added
+    return {
+        "status": "healthy",
+        "message": "FastAPI server is running",
+        "worker": process_memory(),
+        "query_cache": get_query_cache().stats(),
+        "retrieval": retriever.stats(),
+        "openai": openai_limit.stats(),
+        "sessions": sessions.stats(),
+    }
 
 # Stream TTS endpoint
 @app.post("/stream-tts")
@@ -70,14 +119,15 @@ async def stream_tts(request: Request):
             raise HTTPException(status_code=400, detail="No text provided")
         
         logger.info(f"Generating TTS for text: {text[:50]}...")
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="nova",
-            input=text,
-            response_format="mp3"
-        )
+        async with openai_limit:
+            response = await client.audio.speech.create(
+                model="tts-1",
+                voice="nova",
+                input=text,
+                response_format="mp3"
+            )
         
-        audio_buffer = BytesIO(response.read())
+        audio_buffer = BytesIO(response.content)
         audio_buffer.seek(0)
         
         logger.info("Streaming TTS response")
@@ -98,46 +148,56 @@ async def stream_tts(request: Request):
 async def chat(request: ChatRequest):
     logger.debug("Received request for /chat")
     try:
-        bot.conversation_history["messages"] = [{"role": msg.role, "content": msg.content} for msg in request.conversation_history]
-        bot.current_step = request.current_step
-
-        if bot.is_summarization_request(request.user_input):
-            summary = bot.summarize_conversation()
-            logger.info(f"Generated summary: {summary[:100]}...")
-            
-            updated_history = request.conversation_history + [
-                Message(role="user", content=request.user_input),
-                Message(role="assistant", content=summary)
-            ]
-
-            return ChatResponse(
-                response=summary,
-                conversation_history=updated_history,
-                current_step=request.current_step
-            )
-
-        ai_response = virtual_coach_response(
-            conversation_history=[{"role": msg.role, "content": msg.content} for msg in request.conversation_history],
-            user_input=request.user_input,
-            current_step=request.current_step
-        )
+        session_id = request.session_id or new_session_id()
+        if len(session_id) > MAX_SESSION_ID_LENGTH:
+            raise HTTPException(status_code=400, detail="Session ID is too long")
 
-        updated_history = request.conversation_history + [
-            Message(role="user", content=request.user_input),
-            Message(role="assistant", content=ai_response)
-        ]
+        seed = None
+        if request.conversation_history:
+            seed = {
+                "messages": [{"role": msg.role, "content": msg.content} for msg in request.conversation_history],
+                "user_data": {},
+                "current_step": request.current_step or 1
+            }
 
-        next_step = request.current_step + 1 if request.current_step < 10 else request.current_step
+        ai_response, state = await virtual_coach_response(session_id, request.user_input, sessions, seed)
 
         return ChatResponse(
+            session_id=session_id,
             response=ai_response,
-            conversation_history=updated_history,
-            current_step=next_step
+            conversation_history=[Message(**msg) for msg in state["messages"]],
+            current_step=state["current_step"]
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Chat error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+# Retrieval endpoint: closest passages from an agent's indexes
+@app.post("/search", response_model=SearchResponse)
+async def search(request: SearchRequest):
+    logger.debug(f"Received search for agent {request.agent}")
+    try:
+        # Search embeds the query and scans the index synchronously, so it runs off the event loop
+        results = await run_in_threadpool(retriever.search, request.query, request.agent, request.k, request.mode)
+        return SearchResponse(results=results)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Search error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+# Decode uploaded audio and re-encode it as WAV
+def to_wav(audio_data: bytes) -> BytesIO:
+    with sf.SoundFile(BytesIO(audio_data), 'r') as audio_file:
+        data, samplerate = audio_file.read(), audio_file.samplerate
+        logger.debug(f"Audio read: samplerate={samplerate}, data_shape={data.shape}")
+    wav_buffer = BytesIO()
+    sf.write(wav_buffer, data, samplerate, format='WAV')
+    wav_buffer.seek(0)
+    return wav_buffer
+
 # Voice input endpoint
 @app.post("/voice-input")
 async def voice_input(file: UploadFile = File(...)):
@@ -154,27 +214,21 @@ async def voice_input(file: UploadFile = File(...)):
             logger.error("Empty audio file received")
             raise HTTPException(status_code=400, detail="Empty audio file")
         
-        # Convert to WAV format for Whisper compatibility
-        audio_buffer = BytesIO(audio_data)
+        # Convert to WAV format for Whisper compatibility; decoding is CPU work, so off the event loop
         try:
-            with sf.SoundFile(audio_buffer, 'r') as audio_file:
-                data, samplerate = audio_file.read(), audio_file.samplerate
-                logger.debug(f"Audio read: samplerate={samplerate}, data_shape={data.shape}")
+            wav_buffer = await run_in_threadpool(to_wav, audio_data)
         except Exception as e:
             logger.error(f"Error reading audio file: {str(e)}", exc_info=True)
             raise HTTPException(status_code=400, detail=f"Unsupported audio format: {str(e)}. Please use WAV, MP3, or WebM.")
         
-        wav_buffer = BytesIO()
-        sf.write(wav_buffer, data, samplerate, format='WAV')
-        wav_buffer.seek(0)
-        
         logger.info("Transcribing audio with Whisper")
         try:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=wav_buffer,
-                response_format="text"
-            )
+            async with openai_limit:
+                transcript = await client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=("audio.wav", wav_buffer),
+                    response_format="text"
+                )
         except Exception as e:
             logger.error(f"Whisper API error: {str(e)}", exc_info=True)
             raise HTTPException(status_code=500, detail=f"Whisper API error: {str(e)}")
@@ -189,10 +243,11 @@ async def voice_input(file: UploadFile = File(...)):
 
 # Reset conversation endpoint
 @app.post("/reset")
-async def reset_conversation():
+async def reset_conversation(request: Optional[ResetRequest] = None):
     logger.debug("Received request for /reset")
     try:
-        bot.reset_session()
+        if request is not None and request.session_id:
+            await run_in_threadpool(sessions.delete, request.session_id)
         return {
             "conversation_history": [],
             "current_step": 1,
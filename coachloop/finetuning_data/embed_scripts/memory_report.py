@@ -0,0 +1,88 @@
+import os
+import resource
+
+try:
+    import psutil
+except ImportError:  # Falls back to /proc, then to getrusage
+    psutil = None
+
+
+def _proc_value(path, field):
+    """A "Field:   123 kB" value from a /proc file, in bytes."""
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def process_memory():
+    """This process's resident memory in bytes.
+
+    `shared_bytes` counts file-backed pages such as memory-mapped indexes, and `pss_bytes`
+    (where the OS reports it) splits shared pages between the processes mapping them, so
+    the PSS of all workers added together is their real footprint.
+    """
+    report = {"pid": os.getpid(), "rss_bytes": None, "shared_bytes": None, "pss_bytes": None}
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        report["rss_bytes"] = info.rss
+        report["shared_bytes"] = getattr(info, "shared", None)
+    elif os.path.exists("/proc/self/statm"):
+        with open("/proc/self/statm", "r") as f:
+            _, resident, shared = (int(value) for value in f.read().split()[:3])
+        page = os.sysconf("SC_PAGE_SIZE")
+        report["rss_bytes"], report["shared_bytes"] = resident * page, shared * page
+    else:
+        # Peak rather than current RSS; macOS reports bytes, Linux KiB
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["rss_bytes"] = peak if os.uname().sysname == "Darwin" else peak * 1024
+    report["pss_bytes"] = _proc_value("/proc/self/smaps_rollup", "Pss")
+    return report
+
+
+def format_memory(report):
+    mib = lambda value: "n/a" if value is None else f"{value / 1024 ** 2:,.1f} MiB"
+    return f"pid {report['pid']}: RSS {mib(report['rss_bytes'])}, shared {mib(report['shared_bytes'])}, PSS {mib(report['pss_bytes'])}"
+
+
+def _load_and_report(args):
+    """Worker: open every built index, wait for the others, then report memory."""
+    mmap, barrier, results = args
+    from index_catalog import CATALOG, index_paths
+    from index_factory import read_index
+
+    indexes = [read_index(paths["index"], mmap=mmap) for paths in (index_paths(entry) for entry in CATALOG.values())
+               if os.path.exists(paths["index"])]
+    barrier.wait()
+    results.put((len(indexes), process_memory()))
+    barrier.wait()
+
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description="Load every index in N processes at once and report each one's memory.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--no-mmap", action="store_true", help="Read indexes into each process's heap instead")
+    args = parser.parse_args()
+
+    barrier = multiprocessing.Barrier(args.workers)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_load_and_report, args=((not args.no_mmap, barrier, results),))
+               for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    reports = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    print(f"📊 {args.workers} workers, {reports[0][0]} indexes each, {'heap' if args.no_mmap else 'memory-mapped'}:")
+    for _, report in reports:
+        print(f"   {format_memory(report)}")
+    if all(report["pss_bytes"] is not None for _, report in reports):
+        print(f"📌 Total PSS: {sum(report['pss_bytes'] for _, report in reports) / 1024 ** 2:,.1f} MiB")
@@ -0,0 +1,161 @@
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+# File layout (all integers little-endian):
+#   header   magic, version, row count and the byte offset of every section below
+#   blob     UTF-8 chunk texts, back to back
+#   offsets  int64[n + 1]; row i's text is blob[offsets[i]:offsets[i + 1]]
+#   file_ids int32[n]; index into the filename table, -1 for a removed row
+#   filenames JSON list of distinct source filenames
+MAGIC = b"CLMETA\x00\x01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQQQQ")
+METADATA_EXTENSION = ".meta"
+LEGACY_EXTENSION = ".npy"
+
+
+def _align(f, boundary=8):
+    padding = -f.tell() % boundary
+    f.write(b"\0" * padding)
+
+
+# Streams rows into a metadata file; nothing but the offsets is kept in memory
+class MetadataStoreWriter:
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.file = open(self.tmp_path, "wb")
+        self.file.write(b"\0" * HEADER.size)
+        self.offsets = [0]
+        self.file_ids = []
+        self.filenames = {}
+
+    def add(self, meta):
+        """Append one row: a {"filename", "text"} dict, or None for a removed row."""
+        if meta is None:
+            self.file_ids.append(-1)
+        else:
+            self.file_ids.append(self.filenames.setdefault(meta["filename"], len(self.filenames)))
+            self.file.write(meta["text"].encode("utf-8"))
+        self.offsets.append(self.file.tell() - HEADER.size)
+
+    def close(self):
+        f = self.file
+        _align(f)
+        offsets_start = f.tell()
+        f.write(np.asarray(self.offsets, dtype="<i8").tobytes())
+        file_ids_start = f.tell()
+        f.write(np.asarray(self.file_ids, dtype="<i4").tobytes())
+        _align(f)
+        filenames_start = f.tell()
+        filenames = json.dumps(list(self.filenames), ensure_ascii=False).encode("utf-8")
+        f.write(filenames)
+
+        f.seek(0)
+        f.write(HEADER.pack(
+            MAGIC, VERSION, 0, len(self.file_ids), HEADER.size,
+            offsets_start, file_ids_start, filenames_start, len(filenames),
+        ))
+        f.close()
+        os.replace(self.tmp_path, self.path)
+
+
+def write_metadata_store(path, rows):
+    """Write an iterable of metadata rows (dicts or None) to `path`."""
+    writer = MetadataStoreWriter(path)
+    for meta in rows:
+        writer.add(meta)
+    writer.close()
+
+
+# Read-only, memory-mapped view of a metadata file; row lookups are O(1)
+class MetadataStore:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, _, n, blob_start, offsets_start, file_ids_start,
+         filenames_start, filenames_len) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a metadata store: {path}")
+
+        self.blob_start = blob_start
+        self.offsets = np.frombuffer(self.mm, dtype="<i8", count=n + 1, offset=offsets_start)
+        self.file_ids = np.frombuffer(self.mm, dtype="<i4", count=n, offset=file_ids_start)
+        self.filenames = json.loads(self.mm[filenames_start:filenames_start + filenames_len].decode("utf-8"))
+
+    def __len__(self):
+        return len(self.file_ids)
+
+    def text_bytes(self, i):
+        """Zero-copy view of row i's UTF-8 text."""
+        start = self.blob_start + int(self.offsets[i])
+        end = self.blob_start + int(self.offsets[i + 1])
+        return memoryview(self.mm)[start:end]
+
+    def filename(self, i):
+        file_id = int(self.file_ids[i])
+        return self.filenames[file_id] if file_id >= 0 else None
+
+    def __getitem__(self, i):
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        if self.file_ids[i] < 0:
+            return None
+        return {"filename": self.filename(i), "text": str(self.text_bytes(i), "utf-8")}
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def close(self):
+        self.offsets = self.file_ids = None
+        try:
+            self.mm.close()
+        except BufferError:
+            pass  # A caller still holds a text_bytes() view; the map closes once it is released
+
+
+def resolve_metadata_path(path):
+    """Prefer the compact .meta file next to `path`, falling back to a legacy pickled .npy."""
+    stem = os.path.splitext(path)[0]
+    for candidate in (stem + METADATA_EXTENSION, stem + LEGACY_EXTENSION):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def load_metadata_store(path):
+    """Open the metadata for an index, or None if neither format is on disk."""
+    resolved = resolve_metadata_path(path)
+    if resolved is None:
+        return None
+    if resolved.endswith(METADATA_EXTENSION):
+        return MetadataStore(resolved)
+    return np.load(resolved, allow_pickle=True)
+
+
+def convert_legacy_metadata(npy_path):
+    """Rewrite a pickled metadata .npy as a .meta file alongside it."""
+    meta_path = os.path.splitext(npy_path)[0] + METADATA_EXTENSION
+    write_metadata_store(meta_path, np.load(npy_path, allow_pickle=True))
+    return meta_path
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Convert every legacy metadata file under the given folder (default: indexes/)
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "indexes")
+    for folder, _, files in os.walk(root):
+        for filename in files:
+            if filename.startswith("metadata_") and filename.endswith(LEGACY_EXTENSION):
+                meta_path = convert_legacy_metadata(os.path.join(folder, filename))
+                print(f"✅ Converted {filename} -> {os.path.basename(meta_path)}")
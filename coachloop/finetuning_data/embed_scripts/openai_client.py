@@ -0,0 +1,69 @@
+import asyncio
+import os
+import threading
+
+from openai import AsyncOpenAI
+
+# OpenAI calls (chat, TTS, Whisper) in flight at once per worker; the rest wait their turn without blocking the event loop
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 16))
+
+# Seconds before one OpenAI request gives up, and how often the client retries it
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 60))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
+
+
+# Caps how many OpenAI requests a worker has open, and counts how many are running and waiting
+class ConcurrencyLimit:
+    def __init__(self, limit=OPENAI_MAX_CONCURRENCY):
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def __aenter__(self):
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.calls += 1
+        self.peak = max(self.peak, self.in_flight)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.in_flight -= 1
+        self.semaphore.release()
+        return False
+
+    def stats(self):
+        return {"limit": self.limit, "in_flight": self.in_flight, "waiting": self.waiting, "peak": self.peak, "calls": self.calls}
+
+
+_default_client = None
+_default_limit = None
+_default_lock = threading.Lock()
+
+
+def get_async_client():
+    """The worker's shared AsyncOpenAI client; one connection pool for every session."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                timeout=OPENAI_TIMEOUT,
+                max_retries=OPENAI_MAX_RETRIES,
+            )
+        return _default_client
+
+
+def get_openai_limit():
+    """The worker's shared limit; wrap every OpenAI request in `async with get_openai_limit():`."""
+    global _default_limit
+    with _default_lock:
+        if _default_limit is None:
+            _default_limit = ConcurrencyLimit()
+        return _default_limit
@@ -0,0 +1,65 @@
+import os
+import re
+
+from chunker import CHUNK_TOKENS, OVERLAP_TOKENS, chunk_spans, count_tokens
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # PDFs are skipped unless PyMuPDF is installed
+    fitz = None
+
+TEXT_EXTENSION = ".txt"
+PDF_EXTENSION = ".pdf"
+
+# Single line breaks inside a paragraph, as left behind by PDF text extraction
+BROKEN_LINE = re.compile(r"(?<!\n)\n(?!\n)")
+
+
+def source_extensions():
+    """File types the pipeline can read in this environment."""
+    return (TEXT_EXTENSION, PDF_EXTENSION) if fitz is not None else (TEXT_EXTENSION,)
+
+
+def read_pdf(path):
+    """Extract a PDF's text page by page, without writing an intermediate .txt file."""
+    with fitz.open(path) as document:
+        pages = [BROKEN_LINE.sub(" ", page.get_text("text")).strip() for page in document]
+    return "\n\n".join(page for page in pages if page)
+
+
+def read_document(path, clean_pdf=None):
+    if path.lower().endswith(PDF_EXTENSION):
+        text = read_pdf(path)
+        return clean_pdf(text) if clean_pdf is not None else text
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def iter_documents(folder, filenames=None, extensions=None, clean_pdf=None):
+    """Yield (filename, text) one source file at a time; `clean_pdf(text)` tidies text extracted from PDFs."""
+    extensions = extensions or source_extensions()
+    for filename in (sorted(os.listdir(folder)) if filenames is None else filenames):
+        path = os.path.join(folder, filename)
+        if os.path.isfile(path) and filename.lower().endswith(extensions):
+            yield filename, read_document(path, clean_pdf)
+
+
+def iter_chunks(documents, max_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS):
+    """Yield (filename, chunk) for every chunk of every document, in order."""
+    for filename, text in documents:
+        for start, end in chunk_spans(text, max_tokens, overlap_tokens):
+            yield filename, text[start:end]
+
+
+def iter_batches(items, text_of, batch_size, max_tokens):
+    """Group a stream of items into lists that fit one embeddings request."""
+    batch, batch_tokens = [], 0
+    for item in items:
+        tokens = count_tokens(text_of(item))
+        if batch and (len(batch) >= batch_size or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        yield batch
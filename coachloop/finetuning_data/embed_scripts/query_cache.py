@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_cache import get_embedding_cache
+
+# Query embeddings kept in memory, and how long each stays valid (seconds; 0 never expires)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 10000))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 24 * 3600))
+
+# Share query embeddings between processes and restarts through the on-disk embedding cache (0 keeps them in memory only);
+# only the in-memory tier folds case and spacing, the disk tier holds each exact text's own embedding
+QUERY_CACHE_DISK = os.getenv("QUERY_CACHE_DISK", "1") != "0"
+
+
+def normalize_query(text):
+    """Queries that differ only in case or spacing share one cache entry."""
+    return " ".join(text.split()).casefold()
+
+
+# In-process LRU cache of query embeddings with a TTL, in front of the on-disk embedding cache
+class QueryEmbeddingCache:
+    def __init__(self, max_entries=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL, disk=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk = disk
+        self.clock = clock
+        self.entries = OrderedDict()  # (model, normalized query) -> (vector, expiry), least recently used first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _remember(self, key, vector):
+        expiry = self.clock() + self.ttl if self.ttl else None
+        self.entries[key] = (vector, expiry)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, model, text):
+        """Cached embedding of a query, from memory or else the disk tier; None on a miss."""
+        query = normalize_query(text)
+        key = (model, query)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                vector, expiry = entry
+                if expiry is None or expiry > self.clock():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self.entries[key]
+                self.expired += 1
+
+        # The disk tier is the shared content-addressed cache, so it is keyed by the exact text that was embedded
+        vector = self.disk.get(model, text) if self.disk is not None else None
+        with self.lock:
+            if vector is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+                self._remember(key, vector)
+        return vector
+
+    def put(self, model, text, vector):
+        query = normalize_query(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self.lock:
+            self._remember((model, query), vector)
+        if self.disk is not None:
+            self.disk.put(model, text, vector)
+
+    def get_or_embed(self, model, text, embed):
+        """Cached embedding of a query, calling `embed(text)` only on a miss."""
+        vector = self.get(model, text)
+        if vector is None:
+            vector = np.asarray(embed(text), dtype=np.float32)
+            self.put(model, text, vector)
+        return vector
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_query_cache():
+    """Process-wide query embedding cache shared by every request."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = QueryEmbeddingCache(disk=get_embedding_cache() if QUERY_CACHE_DISK else None)
+        return _default_cache
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from lexical_index import tokenize
+
+# Serve a stored answer when a new query's embedding is at least this cosine-similar to an answered one and their
+# key terms overlap at least this much (shared / all terms). ada-002 similarities crowd into 0.7-1.0, so even 0.95
+# pairs up different questions; one swapped term out of two or three ("open" / "close") stays below the overlap
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", 0.98))
+RESPONSE_CACHE_TERM_OVERLAP = float(os.getenv("RESPONSE_CACHE_TERM_OVERLAP", 0.65))
+
+# Answers kept across all agents, and how long each stays valid (seconds; 0 never expires)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 1000))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 3600))
+
+# 0 turns the cache off for every request
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "1") != "0"
+
+
+def prompt_version(*parts):
+    """Short hash of whatever shapes an answer besides the query (system message, chat model), so changing it starts a fresh scope."""
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def key_terms(query):
+    """The words of a query that carry its meaning (stop words, case and order aside)."""
+    return frozenset(tokenize(query))
+
+
+def term_overlap(terms, other):
+    """Jaccard similarity of two sets of key terms; two queries without any count as the same."""
+    if not terms and not other:
+        return 1.0
+    return len(terms & other) / len(terms | other)
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# Answers to earlier queries, looked up by embedding similarity within one (agent, prompt version) scope
+#
+# Similar embeddings alone are not enough: "how do I open a negotiation" and "how do I close a
+# negotiation" embed almost alike, so a hit also needs mostly the same key terms as the answered query.
+class SemanticResponseCache:
+    def __init__(self, threshold=RESPONSE_CACHE_THRESHOLD, max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL,
+                 clock=time.monotonic, term_overlap=RESPONSE_CACHE_TERM_OVERLAP):
+        self.threshold = threshold
+        self.term_overlap = term_overlap
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()  # entry id -> (scope, unit vector, key terms, answer, expiry), least recently used first
+        self.scopes = {}  # scope -> (entry ids, stacked unit vectors), rebuilt after the scope changes
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def _scope_matrix(self, scope):
+        if scope not in self.scopes:
+            ids = [entry_id for entry_id, entry in self.entries.items() if entry[0] == scope]
+            vectors = np.stack([self.entries[entry_id][1] for entry_id in ids]) if ids else None
+            self.scopes[scope] = (ids, vectors)
+        return self.scopes[scope]
+
+    def _drop(self, entry_id):
+        scope = self.entries.pop(entry_id)[0]
+        self.scopes.pop(scope, None)
+
+    def get(self, agent, version, query, query_embedding):
+        """Stored answer for the closest earlier query in scope sharing enough key terms, or None if none is within the thresholds."""
+        scope = (agent, version)
+        terms = key_terms(query)
+        unit = _unit(query_embedding)
+        with self.lock:
+            ids, vectors = self._scope_matrix(scope)
+            if vectors is not None:
+                similarities = vectors @ unit
+                for best in np.argsort(-similarities):
+                    if similarities[best] < self.threshold:
+                        break
+                    entry_id = ids[best]
+                    _, _, entry_terms, answer, expiry = self.entries[entry_id]
+                    if term_overlap(entry_terms, terms) < self.term_overlap or (expiry is not None and expiry <= self.clock()):
+                        continue
+                    self.entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return answer
+            self.misses += 1
+            return None
+
+    def put(self, agent, version, query, query_embedding, answer):
+        expiry = self.clock() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[self.next_id] = ((agent, version), _unit(query_embedding), key_terms(query), answer, expiry)
+            self.next_id += 1
+            self.scopes.pop((agent, version), None)
+            now = self.clock()
+            for entry_id in [entry_id for entry_id, entry in self.entries.items() if entry[4] is not None and entry[4] <= now]:
+                self._drop(entry_id)
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+
+    def bypass(self):
+        """Count a request that skipped the cache, so the hit rate covers every request."""
+        with self.lock:
+            self.bypassed += 1
+
+    def clear(self, agent=None):
+        """Forget every answer, or only one agent's, e.g. after its index has been rebuilt."""
+        with self.lock:
+            for entry_id in [entry_id for entry_id, entry in self.entries.items() if agent is None or entry[0][0] == agent]:
+                self._drop(entry_id)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "term_overlap": self.term_overlap,
+                "ttl": self.ttl,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide answer cache shared by every request."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SemanticResponseCache()
+        return _default_cache
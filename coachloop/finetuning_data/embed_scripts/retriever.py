@@ -0,0 +1,229 @@
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+
+from combined_index import load_combined_index, manifest_signature
+from embedding_backends import get_embedding_backend
+from index_catalog import CATALOG, INDEX_ROOT, index_paths, resolve_name, select_partitions
+from lexical_index import TOKEN, load_lexical_index, tokenize
+from load_faiss import IndexRegistry, get_index_registry
+from metadata_store import load_metadata_store
+from query_cache import get_query_cache
+
+# Queries are embedded by the same backend as the builds; indexes built by another one are refused
+EMBEDDING_BACKEND = get_embedding_backend()
+EMBEDDING_MODEL = EMBEDDING_BACKEND.model
+
+# Results returned when the caller does not ask for a number
+RETRIEVER_TOP_K = int(os.getenv("RETRIEVER_TOP_K", 5))
+
+# Load every index when the retriever is created, rather than on the first query that needs it
+RETRIEVER_WARM = os.getenv("RETRIEVER_WARM", "0") == "1"
+
+# "hybrid" fuses the BM25 and vector rankings; "dense" and "lexical" use only one of them
+RETRIEVER_MODE = os.getenv("RETRIEVER_MODE", "hybrid")
+RETRIEVER_MODES = ("hybrid", "dense", "lexical")
+
+# Reciprocal rank fusion constant, and candidates each ranking contributes per requested result
+RRF_K = 60
+FUSION_DEPTH = 4
+
+# Explicit keyword lookups of at most this many words, whose terms all occur in the corpus, are answered by BM25
+# alone, without an embedding request; natural-language questions always go through hybrid retrieval
+KEYWORD_QUERY_TERMS = int(os.getenv("KEYWORD_QUERY_TERMS", 3))
+
+
+def is_keyword_query(query):
+    """A quoted phrase, or a few words that are all acronyms or IDs, like "ICF PCC"; any ordinary word makes it a question."""
+    query = query.strip()
+    if len(query) > 2 and query[0] == query[-1] and query[0] in "\"'":
+        return True
+    words = TOKEN.findall(query)
+    return 0 < len(words) <= KEYWORD_QUERY_TERMS and all(
+        (len(word) > 1 and word.isupper()) or any(c.isdigit() for c in word) for word in words
+    )
+
+
+def embed_query(text):
+    """One query embedding from the backend; failures raise rather than return a made-up vector."""
+    return np.asarray(EMBEDDING_BACKEND.embed([text])[0], dtype=np.float32)
+
+
+def get_query_embedding(text):
+    """Embedding of a query; repeats (ignoring case and spacing) are served from the query cache without an API call."""
+    return get_query_cache().get_or_embed(EMBEDDING_MODEL, text, embed_query)
+
+
+def as_result(row, score, agent):
+    """The {score, agent, filename, text} shape every search returns, whatever format the metadata row is in."""
+    if isinstance(row, dict):
+        filename, text = row.get("filename"), row.get("text", "")
+    else:
+        filename, text = None, str(row)
+    return {"score": None if score is None else float(score), "agent": agent, "filename": filename, "text": text}
+
+
+def fuse(rankings, k):
+    """Reciprocal rank fusion of several best-first result lists; the same chunk in several lists is merged."""
+    fused = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking):
+            key = (result["agent"], result["text"])
+            merged = fused.setdefault(key, {**result, "rrf": 0.0})
+            merged.update({name: value for name, value in result.items() if value is not None})
+            merged["rrf"] += 1 / (RRF_K + rank + 1)
+    return sorted(fused.values(), key=lambda result: -result["rrf"])[:k]
+
+
+# Keeps every agent's index and metadata loaded, so a query costs one embedding plus one search
+class Retriever:
+    def __init__(self, registry=None, embed=get_query_embedding, embedding_model=EMBEDDING_MODEL, root=INDEX_ROOT,
+                 dimension=EMBEDDING_BACKEND.dimension):
+        self.registry = registry or (get_index_registry() if root == INDEX_ROOT else IndexRegistry(root))
+        self.embed = embed
+        self.embedding_model = embedding_model
+        # Indexes of another dimension are refused on load, rather than failing inside every search
+        self.dimension = dimension
+        self.root = root
+        self.combined = None
+        self.combined_signature = None
+        self.lexical_indexes = {}
+        self.lock = threading.Lock()
+        self.queries = Counter()
+
+    def partitions(self, agent):
+        """Catalog keys an agent name covers: a catalog key or alias, an agent with several corpora, several joined with "+", or "all"."""
+        if agent == "all":
+            return list(CATALOG)
+        names = []
+        for part in agent.split("+"):
+            key = resolve_name(part)
+            for name in [key] if key is not None else select_partitions(agents=[part]):
+                if name not in names:
+                    names.append(name)
+        return names
+
+    def combined_index(self):
+        """The combined index, reopened whenever it or a corpus has been rebuilt; None if it has not been built."""
+        with self.lock:
+            # A few stat() calls per query, so a rebuild is noticed without restarting the server
+            signature = manifest_signature(self.root)
+            if signature != self.combined_signature:
+                self.combined = load_combined_index(self.root, self.embedding_model, self.dimension)
+                self.combined_signature = signature
+            return self.combined
+
+    def lexical_index(self, name):
+        """(BM25 index, metadata) of a corpus, opened once; (None, None) if it has not been built or predates BM25.
+
+        Only the metadata and the .bm25 file are opened; the FAISS index is left to the dense path.
+        """
+        with self.lock:
+            if name not in self.lexical_indexes:
+                paths = index_paths(CATALOG[name], self.root)
+                metadata = load_metadata_store(paths["metadata"])
+                lexical = load_lexical_index(paths["lexical"], len(metadata)) if metadata is not None else None
+                self.lexical_indexes[name] = (lexical, metadata) if lexical is not None else (None, None)
+            return self.lexical_indexes[name]
+
+    def dense_search(self, names, query, k):
+        query_embedding = np.asarray(self.embed(query), dtype=np.float32).reshape(1, -1)
+
+        # Several corpora are one filtered search over the combined index, when it has been built since they were
+        combined = self.combined_index() if len(names) > 1 else None
+        if combined is not None and combined.covers(names):
+            return [as_result(hit, hit["score"], hit["partition"]) for hit in combined.search(query_embedding, k=k, names=names)]
+
+        results = []
+        for name in names:
+            index, metadata = self.registry.get(name, embedding_model=self.embedding_model, dimension=self.dimension)
+            if index is None:
+                continue
+            distances, ids = index.search(query_embedding, k)
+            for distance, i in zip(distances[0], ids[0]):
+                row = metadata[i] if 0 <= i < len(metadata) else None
+                if row is not None:
+                    results.append(as_result(row, distance, name))
+        results.sort(key=lambda result: result["score"])
+        return results[:k]
+
+    def lexical_search(self, names, query, k):
+        """(BM25 results best first, whether every query term occurs in these corpora); results are None without BM25 indexes."""
+        results, lexical_indexes = [], []
+        for name in names:
+            lexical, metadata = self.lexical_index(name)
+            if lexical is None:
+                continue
+            lexical_indexes.append(lexical)
+            ids, scores = lexical.search(query, k)
+            for i, score in zip(ids, scores):
+                result = as_result(metadata[i], None, name)
+                result["bm25"] = float(score)
+                results.append(result)
+        if not lexical_indexes:
+            return None, False
+        results.sort(key=lambda result: -result["bm25"])
+        terms = set(tokenize(query))
+        all_found = bool(terms) and all(any(lexical.document_frequency(term) for lexical in lexical_indexes) for term in terms)
+        return results[:k], all_found
+
+    def search(self, query, agent, k=RETRIEVER_TOP_K, mode=RETRIEVER_MODE):
+        """Top-k chunks for a query from an agent's corpora, best first.
+
+        Each result is {"score", "agent", "filename", "text"}; the score is the L2 distance
+        (lower is closer), or None for chunks only the keyword index found. BM25 matches add
+        "bm25", and fused rankings add their "rrf" score. Explicit keyword lookups (see
+        is_keyword_query) whose terms all occur in the corpus are answered from the BM25 index
+        alone, without embedding the query.
+        Unknown agents and missing indexes give no results.
+        """
+        if mode not in RETRIEVER_MODES:
+            raise ValueError(f"Unknown retrieval mode '{mode}'. Use one of: {', '.join(RETRIEVER_MODES)}")
+        names = self.partitions(agent)
+        if not names:
+            print(f"❌ Error: Unknown agent '{agent}'. Use one of: {', '.join(CATALOG)}, or 'all'.")
+            return []
+
+        lexical = None
+        if mode != "dense":
+            lexical, all_found = self.lexical_search(names, query, k * FUSION_DEPTH if mode == "hybrid" else k)
+            if mode == "lexical" or (lexical and all_found and is_keyword_query(query)):
+                self._count("lexical")
+                return (lexical or [])[:k]
+
+        if lexical is None:
+            self._count("dense")
+            return self.dense_search(names, query, k)
+        self._count("hybrid")
+        return fuse([self.dense_search(names, query, k * FUSION_DEPTH), lexical], k)
+
+    def _count(self, mode):
+        with self.lock:
+            self.queries[mode] += 1
+
+    def stats(self):
+        """Queries answered by BM25 alone, by vectors alone and by both."""
+        with self.lock:
+            return dict(self.queries)
+
+    def warm(self, agents=None):
+        """Load the indexes of some agents (default: all) ahead of their first query."""
+        for name in self.partitions("+".join(agents)) if agents else list(CATALOG):
+            self.registry.get(name, embedding_model=self.embedding_model, dimension=self.dimension)
+
+
+_default_retriever = None
+_default_retriever_lock = threading.Lock()
+
+
+def get_retriever():
+    """Process-wide retriever shared by the API servers and scripts."""
+    global _default_retriever
+    with _default_retriever_lock:
+        if _default_retriever is None:
+            _default_retriever = Retriever()
+            if RETRIEVER_WARM:
+                _default_retriever.warm()
+        return _default_retriever
@@ -0,0 +1,226 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # Only the "redis" backend needs it
+    redis = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Where coaching sessions live: "memory" (one worker), "sqlite" (workers on one host) or "redis" (any number of hosts)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+
+# Seconds a session survives without a turn (0 never expires), and sessions kept before the least recently used goes
+SESSION_TTL = float(os.getenv("SESSION_TTL", 24 * 3600))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", 10000))
+
+# Seconds a session seeded from a client's own history lives until the client sends its ID back
+SESSION_SEED_TTL = float(os.getenv("SESSION_SEED_TTL", 900))
+
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(BASE_DIR, "sessions.sqlite"))
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+SESSION_REDIS_PREFIX = "coachloop:session:"
+
+MAX_SESSION_ID_LENGTH = 128
+
+
+def new_session_id():
+    return secrets.token_urlsafe(16)
+
+
+def new_session_state():
+    """A conversation before its first turn."""
+    return {"messages": [], "user_data": {}, "current_step": 1}
+
+
+# Sessions in this process: LRU with an idle TTL. Not shared between workers
+class MemorySessionBackend:
+    name = "memory"
+
+    def __init__(self, max_entries=SESSION_MAX_ENTRIES, ttl=SESSION_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()  # session ID -> (state as JSON, expiry), least recently used first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id):
+        with self.lock:
+            entry = self.entries.get(session_id)
+            if entry is not None and (entry[1] is None or entry[1] > self.clock()):
+                self.entries[session_id] = (entry[0], self.clock() + self.ttl if self.ttl else None)
+                self.entries.move_to_end(session_id)
+                self.hits += 1
+                # Stored as JSON, like the other backends, so callers never share a mutable state
+                return json.loads(entry[0])
+            self.entries.pop(session_id, None)
+            self.misses += 1
+            return None
+
+    def put(self, session_id, state, ttl=None):
+        """Store a session; `ttl` overrides the TTL until its next get()."""
+        data = json.dumps(state, ensure_ascii=False)
+        ttl = ttl or self.ttl
+        with self.lock:
+            self.entries[session_id] = (data, self.clock() + ttl if ttl else None)
+            self.entries.move_to_end(session_id)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, session_id):
+        with self.lock:
+            self.entries.pop(session_id, None)
+
+    def stats(self):
+        with self.lock:
+            return {"backend": self.name, "sessions": len(self.entries), "hits": self.hits, "misses": self.misses,
+                    "max_entries": self.max_entries, "ttl": self.ttl}
+
+
+# Sessions in a SQLite file (WAL), shared by every worker on the host
+class SQLiteSessionBackend:
+    name = "sqlite"
+
+    def __init__(self, path=SESSION_DB_PATH, max_entries=SESSION_MAX_ENTRIES, ttl=SESSION_TTL, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)")
+        self.conn.commit()
+
+    def get(self, session_id):
+        now = self.clock()
+        with self.lock:
+            row = self.conn.execute("SELECT state, last_used FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None and (not self.ttl or row[1] + self.ttl > now):
+                self.conn.execute("UPDATE sessions SET last_used = ? WHERE session_id = ?", (now, session_id))
+                self.conn.commit()
+                self.hits += 1
+                return json.loads(row[0])
+            if row is not None:
+                self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self.conn.commit()
+            self.misses += 1
+            return None
+
+    def put(self, session_id, state, ttl=None):
+        """Store a session; `ttl` overrides the TTL until its next get()."""
+        now = self.clock()
+        # A shorter TTL is stored as an older last use, which also puts the session first in line for eviction
+        last_used = now - (self.ttl - ttl) if ttl and self.ttl and ttl < self.ttl else now
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, state, last_used) VALUES (?, ?, ?)",
+                (session_id, json.dumps(state, ensure_ascii=False), last_used),
+            )
+            if self.ttl:
+                self.conn.execute("DELETE FROM sessions WHERE last_used <= ?", (now - self.ttl,))
+            # Least recently used sessions beyond the limit
+            self.conn.execute(
+                "DELETE FROM sessions WHERE session_id IN "
+                "(SELECT session_id FROM sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.conn.commit()
+
+    def delete(self, session_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            sessions = self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            return {"backend": self.name, "sessions": sessions, "hits": self.hits, "misses": self.misses,
+                    "max_entries": self.max_entries, "ttl": self.ttl, "path": self.path}
+
+
+# Sessions in Redis, or anything speaking its GET / SET EX / EXPIRE / DEL commands (Valkey, KeyDB, a local stand-in)
+#
+# The TTL slides with every turn; capping the session count is left to the server's maxmemory-policy (allkeys-lru).
+class RedisSessionBackend:
+    name = "redis"
+
+    def __init__(self, client=None, url=SESSION_REDIS_URL, ttl=SESSION_TTL, prefix=SESSION_REDIS_PREFIX):
+        if client is None:
+            if redis is None:
+                raise ValueError("The redis session backend needs the redis package (pip install redis), or pass a client")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id):
+        key = self.prefix + session_id
+        data = self.client.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        if self.ttl:
+            self.client.expire(key, int(self.ttl))
+        self.hits += 1
+        return json.loads(data)
+
+    def put(self, session_id, state, ttl=None):
+        """Store a session; `ttl` overrides the TTL until its next get()."""
+        ttl = ttl or self.ttl
+        self.client.set(self.prefix + session_id, json.dumps(state, ensure_ascii=False), ex=int(ttl) if ttl else None)
+
+    def delete(self, session_id):
+        self.client.delete(self.prefix + session_id)
+
+    def stats(self):
+        return {"backend": self.name, "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+SESSION_BACKENDS = {}
+
+
+def register_session_backend(name, factory):
+    """Add or replace a backend; `factory()` returns an object with get, put (with an optional ttl), delete and stats."""
+    SESSION_BACKENDS[name] = factory
+
+
+register_session_backend("memory", MemorySessionBackend)
+register_session_backend("sqlite", SQLiteSessionBackend)
+register_session_backend("redis", RedisSessionBackend)
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Process-wide session store (backend from SESSION_BACKEND)."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            if SESSION_BACKEND not in SESSION_BACKENDS:
+                raise ValueError(f"Unknown session backend '{SESSION_BACKEND}'. Use one of: {', '.join(SESSION_BACKENDS)}")
+            _default_store = SESSION_BACKENDS[SESSION_BACKEND]()
+        return _default_store
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# The embed scripts import each other as top-level modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Tests embed with the local backend and never touch the API or the real embedding cache
+os.environ.setdefault("EMBEDDING_BACKEND", "local")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(tempfile.mkdtemp(prefix="coachloop-tests-"), "embedding_cache.sqlite"))
+os.environ.setdefault("QUERY_CACHE_DISK", "0")
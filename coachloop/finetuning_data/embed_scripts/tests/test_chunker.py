@@ -0,0 +1,27 @@
+from chunker import chunk_spans, count_tokens, sentence_spans
+
+
+def test_chunks_end_on_sentences_and_respect_the_budget():
+    text = " ".join(f"Sentence {i} is about topic {i % 5}." for i in range(200))
+    spans = chunk_spans(text, max_tokens=60, overlap_tokens=15)
+    starts, ends = zip(*[(start, end) for start, end, _ in sentence_spans(text)])
+    for start, end in spans:
+        assert start in starts and end in ends
+        assert count_tokens(text[start:end]) <= 60
+    # Nothing is lost between chunks
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    assert all(next_start <= end for (_, end), (next_start, _) in zip(spans, spans[1:]))
+
+
+def test_chunks_repeat_trailing_sentences_as_overlap():
+    text = " ".join(f"Sentence {i} is here." for i in range(40))
+    first, second = chunk_spans(text, max_tokens=40, overlap_tokens=12)[:2]
+    assert second[0] < first[1]
+    assert text[second[0]:first[1]].endswith(".")
+
+
+def test_overlong_sentence_is_split_at_words():
+    text = "word " * 500 + "end."
+    spans = chunk_spans(text, max_tokens=50, overlap_tokens=0)
+    assert len(spans) > 1
+    assert all(count_tokens(text[start:end]) <= 50 for start, end in spans)
@@ -0,0 +1,30 @@
+from chunker import count_tokens
+from context_packer import GAP, format_prompt, pack_context
+
+
+def test_overlapping_hits_do_not_repeat_sentences():
+    shared = "Silence after an offer is a tool."
+    hits = [
+        {"agent": "negotiation", "filename": "a.txt", "text": f"Anchor high with data. {shared}"},
+        {"agent": "negotiation", "filename": "a.txt", "text": f"{shared} Concede slowly and in small steps."},
+    ]
+    passages = pack_context("how do I anchor an offer", hits, budget=500)
+    texts = " ".join(passage["text"] for passage in passages)
+    assert texts.count(shared) == 1
+    assert "Concede slowly" in passages[1]["text"]
+
+
+def test_passages_fit_the_budget_and_keep_relevant_sentences():
+    filler = " ".join(f"Unrelated sentence number {i} about the weather." for i in range(60))
+    hits = [{"agent": "a", "filename": "a.txt", "text": f"{filler} The anchor sets the range for the negotiation. {filler}"}]
+    passages = pack_context("negotiation anchor", hits, budget=120, passage_tokens=60)
+    assert len(passages) == 1 and passages[0]["tokens"] <= 60
+    assert "The anchor sets the range" in passages[0]["text"]
+    assert GAP.strip() in passages[0]["text"]
+    assert sum(count_tokens(passage["text"]) for passage in passages) <= 120
+
+
+def test_prompt_without_passages_is_the_question():
+    assert format_prompt("hello?", []) == "hello?"
+    prompt = format_prompt("hello?", [{"filename": "a.txt", "text": "Hi.", "agent": "a", "tokens": 2}])
+    assert "[1] (a.txt) Hi." in prompt and prompt.endswith("Question: hello?")
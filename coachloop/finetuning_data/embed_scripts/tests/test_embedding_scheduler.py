@@ -0,0 +1,42 @@
+import embedding_scheduler
+from embedding_scheduler import NO_RATE_LIMIT, EmbeddingScheduler
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def test_only_the_failing_chunk_is_given_up(monkeypatch):
+    monkeypatch.setattr(embedding_scheduler.time, "sleep", lambda seconds: None)
+
+    def embed(texts):
+        if "bad" in texts:
+            raise ValueError("input rejected")
+        return [[float(len(text))] for text in texts]
+
+    scheduler = EmbeddingScheduler(embed, len, NO_RATE_LIMIT, max_in_flight=2, max_retries=2)
+    assert scheduler.embed_batch(["a", "bb", "bad", "cccc"]) == [[1.0], [2.0], None, [4.0]]
+
+
+def test_rate_limits_are_waited_out_and_counted():
+    failures = [RateLimited(), RateLimited()]
+
+    def embed(texts):
+        if failures:
+            raise failures.pop()
+        return [[1.0] for _ in texts]
+
+    paused = []
+    limiter = type("Limiter", (), {"acquire": lambda self, tokens: None, "pause": lambda self, seconds: paused.append(seconds)})()
+    scheduler = EmbeddingScheduler(embed, len, limiter)
+    assert scheduler.embed_batch(["x", "y"]) == [[1.0], [1.0]]
+    assert scheduler.rate_limited == 2 and len(paused) == 2
+    assert scheduler.tokens_sent == 2
+
+
+def test_results_keep_input_order():
+    scheduler = EmbeddingScheduler(lambda texts: [[float(text)] for text in texts], len, NO_RATE_LIMIT, max_in_flight=4)
+    texts = [str(i) for i in range(20)]
+    assert scheduler.run(texts, [[i, i + 1] for i in range(0, 20, 2)]) == [[float(i)] for i in range(20)]
+    streamed = [embedding for _, embeddings in scheduler.stream([texts[i:i + 3] for i in range(0, 20, 3)]) for embedding in embeddings]
+    assert streamed == [[float(i)] for i in range(20)]
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import utils
+from index_catalog import CATALOG, index_paths
+from index_factory import read_index
+from index_manifest import load_manifest
+from metadata_store import load_metadata_store
+
+SOURCE = {"agent": "scratch", "source": "pdf", "text_folder": "src", "index_dir": "scratch", "suffix": "scratch"}
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """An empty source folder that create_faiss_index("scratch") builds under tmp_path."""
+    monkeypatch.setattr(utils, "FINETUNING_DIR", str(tmp_path))
+    monkeypatch.setattr(utils, "INDEX_ROOT", str(tmp_path / "indexes"))
+    monkeypatch.setitem(CATALOG, "scratch", SOURCE)
+    (tmp_path / "src").mkdir()
+    return tmp_path / "src"
+
+
+def sentences(topic, count):
+    return " ".join(f"The {topic} sentence number {i} makes point {i * 7}." for i in range(count))
+
+
+def built(corpus):
+    paths = index_paths(SOURCE, str(corpus.parent / "indexes"))
+    return read_index(paths["index"]), load_metadata_store(paths["metadata"]), load_manifest(paths["manifest"])
+
+
+def assert_every_row_finds_itself(index, metadata):
+    """Each live row's own text retrieves it first, so vectors and metadata line up."""
+    live = [i for i in range(len(metadata)) if metadata[i] is not None]
+    assert index.ntotal == len(live)
+    queries = np.asarray(utils.EMBEDDING_BACKEND.embed([metadata[i]["text"] for i in live]), dtype=np.float32)
+    _, found = index.search(queries, 1)
+    assert found[:, 0].tolist() == live
+
+
+def test_incremental_rebuild_only_touches_changed_files(corpus):
+    (corpus / "kept.txt").write_text(sentences("budget", 400))
+    (corpus / "edited.txt").write_text(sentences("hiring", 200))
+    (corpus / "removed.txt").write_text(sentences("travel", 20))
+    utils.create_faiss_index("scratch", incremental=True)
+    _, metadata, before = built(corpus)
+    kept = [metadata[i]["text"] for i in range(*before["files"]["kept.txt"]["ids"])]
+
+    (corpus / "edited.txt").write_text(sentences("onboarding", 300))
+    (corpus / "added.txt").write_text(sentences("pricing", 100))
+    (corpus / "removed.txt").unlink()
+    utils.create_faiss_index("scratch", incremental=True)
+    index, metadata, after = built(corpus)
+
+    assert set(after["files"]) == {"kept.txt", "edited.txt", "added.txt"}
+    # The unchanged file keeps its chunks; only the edited and added files were chunked again, after it
+    start, end = after["files"]["kept.txt"]["ids"]
+    assert [metadata[i]["text"] for i in range(start, end)] == kept
+    assert min(after["files"][name]["ids"][0] for name in ("edited.txt", "added.txt")) >= end
+    assert {row["filename"] for row in metadata if row is not None} == set(after["files"])
+    assert all("onboarding" in metadata[i]["text"] for i in range(*after["files"]["edited.txt"]["ids"]))
+    assert_every_row_finds_itself(index, metadata)
+
+
+def test_near_duplicate_chunks_are_indexed_once(corpus):
+    text = sentences("negotiation", 400)
+    (corpus / "original.txt").write_text(text)
+    (corpus / "copy.txt").write_text(text.replace("number 5 ", "number five "))
+
+    utils.create_faiss_index("scratch", dedup_threshold=0.85)
+    index, metadata, _ = built(corpus)
+    filenames = [row["filename"] for row in metadata if row is not None]
+    assert len(set(filenames)) == 1
+    assert_every_row_finds_itself(index, metadata)
+
+    utils.create_faiss_index("scratch", dedup_threshold=0)
+    _, metadata, _ = built(corpus)
+    assert {row["filename"] for row in metadata if row is not None} == {"original.txt", "copy.txt"}
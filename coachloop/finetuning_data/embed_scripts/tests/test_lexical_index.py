@@ -0,0 +1,31 @@
+from lexical_index import load_lexical_index, tokenize, write_lexical_index
+
+ROWS = [
+    {"filename": "a.txt", "text": "Open the negotiation with a strong anchor."},
+    None,
+    {"filename": "b.txt", "text": "Close the presentation with a clear call to action."},
+    {"filename": "c.txt", "text": "A negotiation anchor anchors the negotiation, anchor after anchor."},
+]
+
+
+def test_tokenize_drops_case_and_stop_words():
+    assert tokenize("How do I OPEN the Negotiation?") == ["open", "negotiation"]
+
+
+def test_bm25_ranks_matching_rows_and_skips_the_rest(tmp_path):
+    path = str(tmp_path / "lexical.bm25")
+    write_lexical_index(path, ROWS)
+    index = load_lexical_index(path, rows=len(ROWS))
+
+    ids, scores = index.search("negotiation anchor", k=10)
+    assert ids.tolist() == [3, 0]
+    assert scores[0] > scores[1] > 0
+    assert index.search("presentation", k=10)[0].tolist() == [2]
+    assert index.search("unrelated words", k=10)[0].tolist() == []
+    assert index.document_frequency("negotiation") == 2
+
+
+def test_index_for_another_row_count_is_ignored(tmp_path):
+    path = str(tmp_path / "lexical.bm25")
+    write_lexical_index(path, ROWS)
+    assert load_lexical_index(path, rows=len(ROWS) + 1) is None
@@ -0,0 +1,27 @@
+import pytest
+
+from metadata_store import load_metadata_store, write_metadata_store
+
+
+def test_rows_round_trip_with_holes(tmp_path):
+    path = str(tmp_path / "metadata.meta")
+    rows = [
+        {"filename": "a.txt", "text": "First chunk."},
+        None,  # A chunk removed by an incremental rebuild keeps its ID
+        {"filename": "b.txt", "text": "Ünïcode survives ✓"},
+        {"filename": "a.txt", "text": ""},
+    ]
+    write_metadata_store(path, rows)
+
+    store = load_metadata_store(path)
+    assert len(store) == len(rows)
+    assert list(store) == rows
+    assert store[-1] == rows[-1]
+    assert store.filename(1) is None and store.filename(2) == "b.txt"
+    assert str(store.text_bytes(2), "utf-8") == rows[2]["text"]
+    with pytest.raises(IndexError):
+        store[len(rows)]
+
+
+def test_missing_store_loads_as_none(tmp_path):
+    assert load_metadata_store(str(tmp_path / "missing.meta")) is None
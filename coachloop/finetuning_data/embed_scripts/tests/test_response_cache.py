@@ -0,0 +1,47 @@
+import numpy as np
+
+from response_cache import RESPONSE_CACHE_THRESHOLD, SemanticResponseCache, term_overlap
+
+
+def near(vector, similarity, seed=0):
+    """A unit vector at the given cosine similarity to `vector`."""
+    vector = vector / np.linalg.norm(vector)
+    noise = np.random.default_rng(seed).standard_normal(len(vector))
+    noise -= noise @ vector * vector
+    noise /= np.linalg.norm(noise)
+    return similarity * vector + np.sqrt(1 - similarity ** 2) * noise
+
+
+def test_default_threshold_is_strict():
+    assert RESPONSE_CACHE_THRESHOLD >= 0.98
+
+
+def test_near_miss_questions_do_not_share_an_answer():
+    cache = SemanticResponseCache()
+    base = np.random.default_rng(1).standard_normal(64)
+    cache.put("negotiation", "v1", "How do I open a negotiation?", base, "open answer")
+
+    # Embeddings this close would pass the threshold; the questions still differ
+    assert cache.get("negotiation", "v1", "How do I close a negotiation?", near(base, 0.995)) is None
+    assert cache.get("negotiation", "v1", "How do I open a presentation?", near(base, 0.995)) is None
+    # Same terms, but the embeddings are too far apart
+    assert cache.get("negotiation", "v1", "How do I open a negotiation?", near(base, 0.96)) is None
+
+
+def test_same_question_reworded_is_served_from_the_cache():
+    cache = SemanticResponseCache()
+    base = np.random.default_rng(2).standard_normal(64)
+    cache.put("negotiation", "v1", "How do I open a negotiation?", base, "open answer")
+
+    assert cache.get("negotiation", "v1", "how do i OPEN a negotiation", near(base, 0.99)) == "open answer"
+    # An extra word is still the same question, as long as the embeddings agree
+    assert cache.get("negotiation", "v1", "How should I open a negotiation?", near(base, 0.99)) == "open answer"
+    # Another agent or prompt version never sees it
+    assert cache.get("presentation", "v1", "How do I open a negotiation?", base) is None
+    assert cache.get("negotiation", "v2", "How do I open a negotiation?", base) is None
+
+
+def test_term_overlap():
+    assert term_overlap(frozenset({"open", "negotiation"}), frozenset({"should", "open", "negotiation"})) == 2 / 3
+    assert term_overlap(frozenset({"open", "negotiation"}), frozenset({"close", "negotiation"})) == 1 / 3
+    assert term_overlap(frozenset(), frozenset()) == 1.0
@@ -0,0 +1,72 @@
+import pytest
+
+import utils
+from index_catalog import CATALOG
+from load_faiss import IndexRegistry
+from retriever import Retriever, embed_query, fuse, is_keyword_query
+
+SOURCE = {"agent": "scratch", "source": "pdf", "text_folder": "src", "index_dir": "scratch", "suffix": "scratch"}
+
+DOCUMENTS = {
+    "salary.txt": "Negotiate the salary offer after the written offer arrives. Anchor the salary with market data.",
+    "slides.txt": "Keep presentation slides short. One idea per slide keeps the audience with you.",
+    "feedback.txt": "Give feedback on behaviour, not character. Ask the colleague what they saw first.",
+    # A table-of-contents line: no words at all, so the local backend embeds it as a zero vector
+    "leaders.txt": ". . . . . . . . . . . .",
+}
+
+
+@pytest.fixture
+def retriever(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "FINETUNING_DIR", str(tmp_path))
+    monkeypatch.setattr(utils, "INDEX_ROOT", str(tmp_path / "indexes"))
+    monkeypatch.setitem(CATALOG, "scratch", SOURCE)
+    (tmp_path / "src").mkdir()
+    for filename, text in DOCUMENTS.items():
+        (tmp_path / "src" / filename).write_text(text)
+    utils.create_faiss_index("scratch")
+
+    root = str(tmp_path / "indexes")
+    return Retriever(registry=IndexRegistry(root), embed=embed_query, embedding_model=utils.EMBEDDING_MODEL, root=root)
+
+
+def test_dense_search_ranks_the_matching_passage_first(retriever):
+    hits = retriever.search("how do I negotiate a salary offer", "scratch", k=3, mode="dense")
+    assert hits[0]["filename"] == "salary.txt"
+    assert [hit["score"] for hit in hits] == sorted(hit["score"] for hit in hits)
+
+
+def test_blank_chunks_never_win_a_search(retriever):
+    index, metadata = retriever.registry.get("scratch")
+    assert len(metadata) == len(DOCUMENTS) and index.ntotal == len(DOCUMENTS) - 1
+    # A query unlike every passage would otherwise land on the zero vector, at distance 1 from any unit query
+    for query in ("quarterly tax filing deadlines", "giving feedback to a colleague"):
+        hits = retriever.search(query, "scratch", k=len(DOCUMENTS), mode="dense")
+        assert "leaders.txt" not in [hit["filename"] for hit in hits]
+
+
+def test_index_of_another_dimension_is_refused_not_searched(retriever):
+    other = Retriever(registry=IndexRegistry(retriever.root), embed=lambda text: [0.0] * 1536,
+                      embedding_model=None, root=retriever.root, dimension=1536)
+    assert other.search("salary offer", "scratch", k=3, mode="dense") == []
+
+
+def test_lexical_and_hybrid_search(retriever):
+    assert retriever.search("slides audience", "scratch", k=1, mode="lexical")[0]["filename"] == "slides.txt"
+    hits = retriever.search("salary offer", "scratch", k=2, mode="hybrid")
+    assert hits[0]["filename"] == "salary.txt" and hits[0]["bm25"] > 0 and hits[0]["rrf"] > hits[1]["rrf"]
+
+
+def test_keyword_queries():
+    assert is_keyword_query('"salary offer"')
+    assert is_keyword_query("ICF PCC")
+    assert is_keyword_query("ISO 9001")
+    assert not is_keyword_query("how do I open a negotiation")
+
+
+def test_fusion_merges_the_same_chunk_and_rewards_agreement():
+    dense = [{"agent": "a", "text": "one", "score": 0.1}, {"agent": "a", "text": "two", "score": 0.2}]
+    lexical = [{"agent": "a", "text": "two", "score": None, "bm25": 3.0}, {"agent": "a", "text": "three", "score": None, "bm25": 1.0}]
+    fused = fuse([dense, lexical], k=3)
+    assert [hit["text"] for hit in fused] == ["two", "one", "three"]
+    assert fused[0]["score"] == 0.2 and fused[0]["bm25"] == 3.0
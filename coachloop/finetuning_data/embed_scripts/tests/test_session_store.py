@@ -0,0 +1,80 @@
+import ast
+import os
+import subprocess
+import sys
+
+import session_store
+
+SCRIPTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def selected_backend(env):
+    """Name of the store get_session_store() builds in a fresh interpreter with `env` set."""
+    result = subprocess.run(
+        [sys.executable, "-c", "from session_store import get_session_store; print(get_session_store().name)"],
+        cwd=SCRIPTS_DIR, env={**os.environ, **env}, capture_output=True, text=True, check=True,
+    )
+    return result.stdout.strip()
+
+
+def test_backend_is_selected_from_the_environment(tmp_path):
+    assert selected_backend({"SESSION_BACKEND": "memory"}) == "memory"
+    assert selected_backend({"SESSION_BACKEND": "sqlite", "SESSION_DB_PATH": str(tmp_path / "sessions.sqlite")}) == "sqlite"
+    assert (tmp_path / "sessions.sqlite").exists()
+
+
+def test_main_loads_dotenv_before_importing_settings_modules():
+    with open(os.path.join(SCRIPTS_DIR, "main.py"), "r", encoding="utf-8") as f:
+        body = ast.parse(f.read()).body
+    load = next(
+        i for i, node in enumerate(body)
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Call) and getattr(node.value.func, "id", None) == "load_dotenv"
+    )
+    for i, node in enumerate(body):
+        if isinstance(node, ast.ImportFrom) and node.module in ("session_store", "openai_client", "retriever", "query_cache"):
+            assert i > load, f"{node.module} is imported before load_dotenv()"
+
+
+def test_sqlite_sessions_survive_a_restart(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    state = {"messages": [{"role": "user", "content": "hi"}], "user_data": {"goal": "focus"}, "current_step": 2}
+    session_store.SQLiteSessionBackend(path).put("abc", state)
+    assert session_store.SQLiteSessionBackend(path).get("abc") == state
+
+
+def test_memory_backend_evicts_least_recently_used_and_expired():
+    now = [0.0]
+    store = session_store.MemorySessionBackend(max_entries=2, ttl=10, clock=lambda: now[0])
+    store.put("a", session_store.new_session_state())
+    store.put("b", session_store.new_session_state())
+    store.get("a")
+    store.put("c", session_store.new_session_state())
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    now[0] = 20
+    assert store.get("a") is None
+
+
+def test_seeded_sessions_expire_early_unless_used():
+    now = [0.0]
+    store = session_store.MemorySessionBackend(ttl=100, clock=lambda: now[0])
+    store.put("seeded", session_store.new_session_state(), ttl=10)
+    store.put("returned", session_store.new_session_state(), ttl=10)
+    now[0] = 5
+    assert store.get("returned") is not None  # Back on the full TTL from here
+    now[0] = 20
+    assert store.get("seeded") is None
+    assert store.get("returned") is not None
+
+
+def test_sqlite_seeded_sessions_expire_early(tmp_path):
+    now = [1000.0]
+    store = session_store.SQLiteSessionBackend(str(tmp_path / "sessions.sqlite"), ttl=100, clock=lambda: now[0])
+    store.put("seeded", session_store.new_session_state(), ttl=10)
+    now[0] += 5
+    assert store.get("seeded") is not None
+    store.put("seeded", session_store.new_session_state())
+    store.put("orphan", session_store.new_session_state(), ttl=10)
+    now[0] += 20
+    assert store.get("orphan") is None
+    assert store.get("seeded") is not None
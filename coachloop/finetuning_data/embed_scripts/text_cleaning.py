@@ -0,0 +1,195 @@
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm import tqdm
+
+from chunker import chunk_text
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FINETUNING_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+
+# Fine-tuning examples are sentence-aligned chunks of this many tokens, with no overlap
+FORMAT_CHUNK_TOKENS = 400
+
+# Worker processes for a cleaning run (default: one per core)
+CLEAN_WORKERS = int(os.getenv("CLEAN_WORKERS", 0)) or None
+
+
+def merge(patterns, flags=0):
+    """One compiled alternation for patterns that share a replacement, so the text is scanned once."""
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), flags)
+
+
+# Shared passes; each is (compiled pattern, replacement) and they run in order
+TIMESTAMPS = [r"\[\d{1,2}:\d{2}\]", r"\d{1,2}:\d{2}(?::\d{2})?"]
+COLLAPSE_NEWLINES = (re.compile(r"\n+"), "\n")
+JOIN_BROKEN_LINES = (re.compile(r"(?<!\n)\n(?!\n)"), " ")
+
+FILLER_WORDS = ["uh", "um", "you know", "like", "so", "actually", "basically", "right", "okay"]
+
+
+# A named, pluggable set of regex passes plus the prompt used for fine-tuning examples
+class RuleSet:
+    def __init__(self, name, passes, prompt, strip_after=0):
+        self.name = name
+        self.passes = passes
+        self.prompt = prompt
+        # Passes before this position run on the raw text; the result is stripped before the rest
+        self.strip_after = strip_after
+
+    def clean(self, text):
+        for position, (pattern, replacement) in enumerate(self.passes):
+            if position == self.strip_after:
+                text = text.strip()
+            text = pattern.sub(replacement, text)
+        return text
+
+    def format(self, text):
+        """Chat-format fine-tuning examples for a cleaned text."""
+        return [
+            {"messages": [{"role": "user", "content": self.prompt}, {"role": "assistant", "content": chunk}]}
+            for chunk in chunk_text(text, max_tokens=FORMAT_CHUNK_TOKENS, overlap_tokens=0)
+        ]
+
+
+RULE_SETS = {}
+
+
+def register_rules(rules):
+    """Add or replace a rule set; corpora refer to rule sets by name."""
+    RULE_SETS[rules.name] = rules
+    return rules
+
+
+# PDF extractions: timestamps, page numbers and hard line breaks
+register_rules(RuleSet(
+    "pdf",
+    [(merge(TIMESTAMPS + [r"Page \d+"]), ""), COLLAPSE_NEWLINES, JOIN_BROKEN_LINES],
+    prompt="Teach me about this topic.",
+    strip_after=2,
+))
+
+# Video transcripts: subtitle timings and spoken filler words as well
+register_rules(RuleSet(
+    "transcript",
+    [
+        (merge(TIMESTAMPS + [r"-->\s*\d{1,2}:\d{2}"]), ""),
+        COLLAPSE_NEWLINES,
+        (merge([rf"\b{re.escape(word)}\b" for word in FILLER_WORDS], re.IGNORECASE), ""),
+        JOIN_BROKEN_LINES,
+    ],
+    prompt="Explain this concept in detail.",
+    strip_after=2,
+))
+
+# Trainer corpora: flatten all whitespace and drop non-ASCII characters
+register_rules(RuleSet(
+    "ascii",
+    [(re.compile(r"\s+"), " "), (re.compile(r"[^\x00-\x7F]+"), " ")],
+    prompt="Teach me about this topic.",
+))
+
+# Raw extraction folder, cleaned output folder and rule set for every corpus
+CORPORA = {
+    "support_pdf": ("virtual_coach/extracted_text/extracted_text", "virtual_coach/cleaned_text", "pdf"),
+    "support_video": ("virtual_coach/extracted_video/transcriptions", "virtual_coach/cleaned_video", "transcript"),
+    "behavior_training": (
+        "virtual_trainer/agent_training/behavior_training/extracted_text",
+        "virtual_trainer/agent_training/behavior_training/cleaned_text",
+        "pdf",
+    ),
+    "negotiation_sales": (
+        "virtual_trainer/agent_training/negotiation_sales_agent/extracted_text",
+        "virtual_trainer/agent_training/negotiation_sales_agent/cleaned_text",
+        "ascii",
+    ),
+    "presentation": (
+        "virtual_trainer/agent_training/presentation_agent/extracted_text",
+        "virtual_trainer/agent_training/presentation_agent/cleaned_text",
+        "ascii",
+    ),
+}
+
+
+def is_up_to_date(input_path, output_path):
+    return os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+
+
+def clean_file(rules, input_path, output_path, jsonl=False):
+    """Clean one file in a worker process; returns False if nothing was left to write."""
+    with open(input_path, "r", encoding="utf-8") as f:
+        text = rules.clean(f.read())
+    if not text.strip():
+        return False
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    if jsonl:
+        with open(f"{os.path.splitext(output_path)[0]}.jsonl", "w", encoding="utf-8") as f:
+            for entry in rules.format(text):
+                f.write(json.dumps(entry) + "\n")
+    return True
+
+
+def clean_folder(rules, input_folder, output_folder, jsonl=False, force=False, workers=CLEAN_WORKERS):
+    """Clean every .txt file of a folder across a process pool, skipping outputs newer than their input."""
+    if isinstance(rules, str):
+        rules = RULE_SETS[rules]
+    if not os.path.exists(input_folder):
+        print(f"❌ Error: Folder '{input_folder}' does not exist! Please check your data.")
+        return None
+    os.makedirs(output_folder, exist_ok=True)
+
+    pending, up_to_date = [], 0
+    for filename in sorted(os.listdir(input_folder)):
+        input_path = os.path.join(input_folder, filename)
+        if not (filename.endswith(".txt") and os.path.isfile(input_path)):
+            continue
+        output_path = os.path.join(output_folder, filename)
+        if not force and is_up_to_date(input_path, output_path):
+            up_to_date += 1
+        else:
+            pending.append((input_path, output_path))
+
+    cleaned = empty = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(clean_file, rules, input_path, output_path, jsonl) for input_path, output_path in pending]
+            for (input_path, _), future in tqdm(zip(pending, futures), total=len(futures), desc=f"Cleaning {rules.name}"):
+                if future.result():
+                    cleaned += 1
+                else:
+                    empty += 1
+                    print(f"⚠️ Skipping empty file: {os.path.basename(input_path)}")
+
+    print(f"🎉 {cleaned} files cleaned, {up_to_date} already up to date, {empty} empty in {output_folder}")
+    return cleaned
+
+
+def clean_corpus(name, jsonl=False, force=False, workers=CLEAN_WORKERS):
+    input_folder, output_folder, rules = CORPORA[name]
+    print(f"\n🧽 Cleaning {name.replace('_', ' ')} data...")
+    return clean_folder(
+        rules,
+        os.path.join(FINETUNING_DIR, input_folder),
+        os.path.join(FINETUNING_DIR, output_folder),
+        jsonl=jsonl,
+        force=force,
+        workers=workers,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Clean the raw extracted corpora for indexing and fine-tuning.")
+    parser.add_argument("corpora", nargs="*", default=list(CORPORA), help="Corpora to clean (default: all)")
+    parser.add_argument("--jsonl", action="store_true", help="Also write chat-format fine-tuning examples")
+    parser.add_argument("--force", action="store_true", help="Re-clean files whose output is already up to date")
+    parser.add_argument("--workers", type=int, default=CLEAN_WORKERS)
+    args = parser.parse_args()
+
+    for corpus in args.corpora:
+        clean_corpus(corpus, jsonl=args.jsonl, force=args.force, workers=args.workers)
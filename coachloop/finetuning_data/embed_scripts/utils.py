@@ -3,78 +3,282 @@ import openai
 import numpy as np
 import faiss
 import csv
-from tqdm import tqdm
+from operator import itemgetter
+from combined_index import partition_build
+from chunker import CHUNK_TOKENS, OVERLAP_TOKENS, chunk_spans, chunker_settings, count_tokens
+from dedup import DEDUP_THRESHOLD, NearDuplicateFilter
+from embedding_cache import get_embedding_cache
+from embedding_backends import get_embedding_backend
+from embedding_scheduler import NO_RATE_LIMIT, EmbeddingScheduler, get_shared_rate_limiter
+from embedding_export import EmbeddingExportWriter
+from metadata_store import MetadataStore, MetadataStoreWriter, load_metadata_store
+from index_factory import (
+    CODECS, INDEX_TYPES, apply_search_params, choose_index_config, new_index, same_structure,
+    select_training_sample, supports_removal, train_index, write_index,
+)
+from index_catalog import CATALOG, COMBINED, INDEX_ROOT, index_paths, resolve_name
+from index_manifest import (
+    MANIFEST_VERSION, describe_build, diff_sources, file_ids, list_source_files, load_manifest, new_manifest, save_manifest,
+)
+from lexical_index import write_lexical_index
+from pipeline import PDF_EXTENSION, iter_batches, iter_chunks, iter_documents, source_extensions
 
 # Set OpenAI API Key (Ensure it's set in your environment variables)
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
 # Constants
-MAX_TOKENS = 8192
-CHUNK_SIZE = 750
-OVERLAP = 150
-
-# Function to split text into overlapping chunks
-def split_text_into_chunks(text, chunk_size=CHUNK_SIZE, overlap=OVERLAP):
-    words = text.split()
-    chunks = []
-    for i in range(0, len(words), chunk_size - overlap):
-        chunk = " ".join(words[i:i + chunk_size])
-        chunks.append(chunk)
-    return chunks
-
-# Function to load and chunk text files
-def load_and_chunk_texts(folder_path):
-    text_chunks, metadata = [], []
+# Embedding backend (EMBEDDING_BACKEND=openai or local); its model name keys the cache and is recorded in manifests
+EMBEDDING_BACKEND = get_embedding_backend()
+EMBEDDING_MODEL = EMBEDDING_BACKEND.model
 
-    if not os.path.exists(folder_path):
-        print(f"⚠️ Directory not found: {folder_path}")
-        return text_chunks, metadata
+# Embedding request limits (per embeddings.create call)
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300000
+EMBED_BATCH_SIZE = 128
+EMBED_MAX_RETRIES = 3
+
+# Concurrency and quota for index builds (override per API key tier)
+EMBED_MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT", 8))
+EMBED_RPM = int(os.getenv("EMBED_RPM", 3000))
+EMBED_TPM = int(os.getenv("EMBED_TPM", 1000000))
+
+# Binary embedding export precision ("float16" or "float32")
+EMBED_EXPORT_DTYPE = os.getenv("EMBED_EXPORT_DTYPE", "float16")
+
+# Index type for new builds: "flat", "ivf_flat" or "hnsw" (small corpora always use flat)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+
+# Vector codec ("none", "fp16", "sq8" or "pq") and optional PCA output dimension
+FAISS_CODEC = os.getenv("FAISS_CODEC", "none")
+FAISS_PCA_DIM = int(os.getenv("FAISS_PCA_DIM", 0)) or None
+
+# Build PDF corpora straight from their source PDFs through PyMuPDF (1), rather than from the cleaned_text extractions
+INDEX_FROM_PDF = os.getenv("INDEX_FROM_PDF", "0") == "1"
+
+# Renumber vector IDs once this share of the ID space belongs to removed chunks
+COMPACT_RATIO = 0.25
 
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FINETUNING_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
 
-        if os.path.isfile(file_path) and filename.endswith(".txt"):
-            with open(file_path, "r", encoding="utf-8") as file:
-                text = file.read().strip()
-                if len(text.split()) > CHUNK_SIZE:
-                    chunks = split_text_into_chunks(text)
-                    text_chunks.extend(chunks)
-                    metadata.extend([{"filename": filename, "text": chunk} for chunk in chunks])
-                else:
-                    text_chunks.append(text)
-                    metadata.append({"filename": filename, "text": text})
+# Every index we build, keyed by corpus (the build scripts may also use the older aliases)
+INDEX_SOURCES = CATALOG
 
-    return text_chunks, metadata
+# Function to split text into sentence-aligned chunks with token overlap
+def split_text_into_chunks(text, max_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS):
+    return [text[start:end] for start, end in chunk_spans(text, max_tokens, overlap_tokens)]
 
-# Function to get OpenAI embeddings
+# Function to load and chunk source files into lists (index builds stream them instead)
+def load_and_chunk_texts(folder_path, filenames=None):
+    if not os.path.exists(folder_path):
+        print(f"⚠️ Directory not found: {folder_path}")
+        return [], []
+
+    metadata = [{"filename": filename, "text": chunk} for filename, chunk in iter_chunks(iter_documents(folder_path, filenames))]
+    return [meta["text"] for meta in metadata], metadata
+
+# Function to get one embedding from the configured backend
 def get_openai_embedding(text):
+    cache = get_embedding_cache()
+    cached = cache.get(EMBEDDING_MODEL, text)
+    if cached is not None:
+        return cached.tolist()
     try:
-        response = openai.embeddings.create(
-            input=text,
-            model="text-embedding-ada-002"
-        )
-        embedding_data = response.model_dump()
-        return embedding_data["data"][0]["embedding"]
+        embedding = list(map(float, EMBEDDING_BACKEND.embed([text])[0]))
+        cache.put(EMBEDDING_MODEL, text, embedding)
+        return embedding
     except Exception as e:
         print(f"❌ Error generating embedding: {e}")
         return None
 
+# Function to group texts into request-sized batches of positions
+def batch_texts(texts, batch_size=EMBED_BATCH_SIZE, max_tokens=MAX_TOKENS_PER_REQUEST):
+    return iter_batches(range(len(texts)), texts.__getitem__, min(batch_size, MAX_INPUTS_PER_REQUEST), max_tokens)
+
+# Function to embed several texts with a single backend call (one API request for OpenAI)
+def get_openai_embeddings(texts):
+    return EMBEDDING_BACKEND.embed(texts)
+
+# Function to embed many texts concurrently, keeping results aligned with the input order
+def get_openai_embeddings_batched(texts, batch_size=EMBED_BATCH_SIZE, desc="Generating Embeddings",
+                                  max_in_flight=EMBED_MAX_IN_FLIGHT, rpm=EMBED_RPM, tpm=EMBED_TPM):
+    cache = get_embedding_cache()
+    embeddings = cache.get_many(EMBEDDING_MODEL, texts)
+    missing = [position for position, embedding in enumerate(embeddings) if embedding is None]
+    print(f"🗄️ Embedding cache: {len(texts) - len(missing)} cached, {len(missing)} to embed")
+    if not missing:
+        return embeddings
+
+    missing_texts = [texts[position] for position in missing]
+
+    # Persist every finished batch so an interrupted build resumes where it stopped
+    def store_batch(positions, results):
+        cache.put_many(EMBEDDING_MODEL, [missing_texts[p] for p in positions], results)
+
+    scheduler = make_scheduler(max_in_flight, rpm, tpm)
+    fresh = scheduler.run(missing_texts, list(batch_texts(missing_texts, batch_size)), desc=desc, on_batch=store_batch)
+    for position, embedding in zip(missing, fresh):
+        embeddings[position] = embedding
+    return embeddings
+
+# Function to build the embedding scheduler shared by the batched paths
+def make_scheduler(max_in_flight=EMBED_MAX_IN_FLIGHT, rpm=EMBED_RPM, tpm=EMBED_TPM):
+    # Local backends have no quota to respect
+    return EmbeddingScheduler(
+        get_openai_embeddings,
+        count_tokens,
+        get_shared_rate_limiter(rpm, tpm) if EMBEDDING_BACKEND.remote else NO_RATE_LIMIT,
+        max_in_flight=max_in_flight,
+        max_retries=EMBED_MAX_RETRIES,
+    )
+
+# Function to embed one request-sized batch, taking whatever is cached from the cache
+def embed_batch_cached(texts, scheduler, count=True):
+    cache = get_embedding_cache()
+    embeddings = cache.get_many(EMBEDDING_MODEL, texts, count=count)
+    missing = [position for position, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        missing_texts = [texts[position] for position in missing]
+        fresh = scheduler.embed_batch(missing_texts)
+        cache.put_many(EMBEDDING_MODEL, missing_texts, fresh)
+        for position, embedding in zip(missing, fresh):
+            embeddings[position] = embedding
+    return embeddings
+
+# Function to stream (batch, embeddings) pairs for a stream of items, in input order
+def iter_embeddings(items, text_of, scheduler, desc="Generating Embeddings", total=None, batch_size=EMBED_BATCH_SIZE,
+                    count_cache=True):
+    batches = iter_batches(items, text_of, min(batch_size, MAX_INPUTS_PER_REQUEST), MAX_TOKENS_PER_REQUEST)
+    return scheduler.stream(
+        batches,
+        embed=lambda batch: embed_batch_cached([text_of(item) for item in batch], scheduler, count=count_cache),
+        desc=desc,
+        total=total,
+    )
+
+# Function to tell whether an embedding is all zeros (a text with no features, e.g. a dot-leader line, under the local backend)
+#
+# Under L2 a zero vector sits at distance 1 from every unit-norm query, closer than real matches, so it would top every search
+def is_blank(embedding):
+    return not np.any(np.asarray(embedding, dtype=np.float32))
+
+# Function to renumber vector IDs densely once removals leave too many holes
+def compact_ids(live, manifest):
+    live_ids = np.flatnonzero(live)
+    for entry in manifest["files"].values():
+        start, end = entry["ids"]
+        entry["ids"] = [int(np.searchsorted(live_ids, start)), int(np.searchsorted(live_ids, end))]
+    manifest["next_id"] = len(live_ids)
+
+# Function to stream every live chunk of a metadata store into an index and the embedding export
+#
+# Vectors come back from the embedding cache (re-embedding anything evicted since). An
+# existing index of the same structure is patched: stale IDs are removed and only IDs from
+# `first_new_id` on are added; otherwise a new index is trained on a sample and filled.
+# `count_cache=False` keeps these reads out of the cache stats, when a first pass just counted them.
+def index_live_chunks(store, scheduler, index_type, codec, pca_dim, index=None, previous_config=None, stale_ids=(),
+                      first_new_id=0, export_prefix=None, csv_path=None, desc="Indexing", count_cache=True):
+    live_ids = np.flatnonzero(store.file_ids >= 0)
+    previous_config = previous_config or {}
+
+    def chunk_text(i):
+        return str(store.text_bytes(i), "utf-8")
+
+    config, rebuild, export, csv_file, missing = None, False, None, None, []
+    for batch, embeddings in iter_embeddings(live_ids, chunk_text, scheduler, desc=desc, total=len(live_ids),
+                                             count_cache=count_cache):
+        # Blank vectors are never indexed (builds that predate the check may still have their rows)
+        kept = [position for position, embedding in enumerate(embeddings) if embedding is not None and not is_blank(embedding)]
+        missing.extend(batch[position] for position, embedding in enumerate(embeddings) if embedding is None)
+        if not kept:
+            continue
+        ids = np.array([batch[position] for position in kept], dtype=np.int64)
+        vectors = np.array([embeddings[position] for position in kept], dtype=np.float32)
+
+        if config is None:
+            config = choose_index_config(index_type, len(live_ids), vectors.shape[1], codec=codec, pca_dim=pca_dim)
+            rebuild = index is None or not supports_removal(previous_config) or not same_structure(config, previous_config)
+            if rebuild:
+                print(f"🏗️ Building {config['factory']} index over {len(live_ids)} vectors...")
+                index = new_index(vectors.shape[1], config)
+                sample = None
+                if not index.is_trained:
+                    sample_ids = select_training_sample(live_ids, config["training_points"] or len(live_ids))
+                    # The sample is read again below, so only that read counts towards the cache stats
+                    samples = iter_embeddings(sample_ids, chunk_text, scheduler, desc="Training sample", count_cache=False)
+                    sample = np.array([
+                        embedding
+                        for _, sample_embeddings in samples
+                        for embedding in sample_embeddings
+                        if embedding is not None
+                    ], dtype=np.float32)
+                train_index(index, sample)
+            else:
+                # Same index type as last time: patch it in place instead of rebuilding
+                config = previous_config
+                index.remove_ids(np.array(stale_ids, dtype=np.int64))
+
+            if export_prefix is not None:
+                export = EmbeddingExportWriter(export_prefix, dtype=EMBED_EXPORT_DTYPE)
+            if csv_path is not None:
+                csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+                csv_writer = csv.writer(csv_file)
+                csv_writer.writerow(["Filename", "Text"] + [f"Dim_{i}" for i in range(vectors.shape[1])])
+
+        if rebuild:
+            index.add_with_ids(vectors, ids)
+        else:
+            is_new = ids >= first_new_id
+            if is_new.any():
+                index.add_with_ids(vectors[is_new], ids[is_new])
+
+        filenames = [store.filename(i) for i in ids]
+        if export is not None:
+            export.add(ids, vectors, filenames)
+        if csv_file is not None:
+            for i, filename, embed in zip(ids, filenames, vectors):
+                csv_writer.writerow([filename, chunk_text(i)] + list(embed))
+
+    if config is None:
+        return {"index": None, "config": None, "missing": missing, "export": None}
+    if rebuild:
+        apply_search_params(index, config)
+    if csv_file is not None:
+        csv_file.close()
+    return {"index": index, "config": config, "missing": missing, "export": export.close() if export is not None else None}
+
 # Function to create FAISS index for different training agents
-def create_faiss_index(training_type):
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    
-    AGENT_PATHS = {
-        "negotiation_sales": "negotiation_sales_agent",
-        "presentation": "presentation_agent",
-        "behavior_training": "behavior_training"
-    }
-
-    if training_type not in AGENT_PATHS:
-        print("❌ Invalid training type! Use 'negotiation_sales', 'presentation', or 'behavior_training'.")
+#
+# Source files stream through chunking, embedding and index appends one batch at a
+# time: chunk text goes straight to the on-disk metadata store and vectors straight
+# into the index and the export, so memory stays flat however large the corpus is.
+def create_faiss_index(training_type, incremental=False, export_csv=False, index_type=FAISS_INDEX_TYPE,
+                       codec=FAISS_CODEC, pca_dim=FAISS_PCA_DIM, dedup_threshold=DEDUP_THRESHOLD,
+                       max_in_flight=EMBED_MAX_IN_FLIGHT, rpm=EMBED_RPM, tpm=EMBED_TPM):
+    name = resolve_name(training_type)
+    if name is None:
+        print(f"❌ Invalid training type! Use one of: {', '.join(INDEX_SOURCES)}.")
         return
 
-    TEXT_FOLDER = os.path.abspath(os.path.join(BASE_DIR, f"../virtual_trainer/agent_training/{AGENT_PATHS[training_type]}/cleaned_text"))
-    INDEX_DIR = os.path.join(BASE_DIR, "indexes", f"vt_{training_type}")
+    source = INDEX_SOURCES[name]
+    TEXT_FOLDER = os.path.join(FINETUNING_DIR, source["text_folder"])
+    extensions, clean_pdf = source_extensions(), None
+    if INDEX_FROM_PDF and source.get("pdf_folder"):
+        if PDF_EXTENSION not in extensions:
+            print("❌ Error: INDEX_FROM_PDF=1 needs PyMuPDF (pip install PyMuPDF).")
+            return
+        from text_cleaning import RULE_SETS
+
+        # Only the PDFs, cleaned in memory with the same rules as the cleaned_text extractions
+        TEXT_FOLDER = os.path.join(FINETUNING_DIR, source["pdf_folder"])
+        extensions, clean_pdf = (PDF_EXTENSION,), RULE_SETS[source["rules"]].clean
+    paths = index_paths(source, INDEX_ROOT)
+    INDEX_DIR = paths["dir"]
+    INDEX_FILE = paths["index"]
+    METADATA_FILE = paths["metadata"]
+    LEGACY_METADATA_FILE = paths["legacy_metadata"]
+    CSV_FILE = paths["csv"]
+    MANIFEST_FILE = paths["manifest"]
 
     print(f"\n📂 Checking text folder: {TEXT_FOLDER}")
 
@@ -82,55 +286,256 @@ def create_faiss_index(training_type):
         print(f"❌ Error: Folder '{TEXT_FOLDER}' does not exist! Please check the path.")
         return
 
-    texts, metadata = load_and_chunk_texts(TEXT_FOLDER)
-    if not texts:
-        print("❌ No valid text files found! Exiting...")
+    # Incremental runs start from the previous build; anything else starts empty
+    index, old_store, manifest = None, None, None
+    if incremental:
+        manifest = load_manifest(MANIFEST_FILE)
+        if (
+            manifest is None
+            or manifest["embedding_model"] != EMBEDDING_MODEL
+            or manifest.get("chunker") != chunker_settings()
+            or not os.path.exists(INDEX_FILE)
+            or not os.path.exists(METADATA_FILE)
+        ):
+            print("⚠️ No usable manifest from a previous build. Falling back to a full rebuild...")
+            manifest = None
+        else:
+            index = faiss.read_index(INDEX_FILE)
+            old_store = load_metadata_store(METADATA_FILE)
+    if manifest is None:
+        manifest = new_manifest(EMBEDDING_MODEL, chunker_settings(), EMBEDDING_BACKEND.describe())
+
+    source_hashes = list_source_files(TEXT_FOLDER, extensions)
+    added, changed, removed = diff_sources(manifest, source_hashes)
+    print(f"📂 {len(added)} new, {len(changed)} changed, {len(removed)} removed source files in {training_type}.")
+
+    if not (added or changed or removed):
+        print("✅ Index is already up to date." if index is not None else "❌ No valid text files found! Exiting...")
         return
 
-    print(f"📂 Found {len(texts)} text chunks in {training_type}. Generating embeddings...")
+    # A dropped near-duplicate may match a chunk that is about to go away, so re-read those files too
+    if changed or removed:
+        rechunk = [
+            filename for filename, entry in manifest["files"].items()
+            if entry.get("duplicates") and filename in source_hashes and filename not in changed
+        ]
+        if rechunk:
+            print(f"🧬 Re-reading {len(rechunk)} files with near-duplicate chunks.")
+            changed += rechunk
+
+    # Forget every chunk of a file that changed or disappeared
+    stale_ids = [i for filename in changed + removed for i in file_ids(manifest, filename)]
+    for filename in changed + removed:
+        del manifest["files"][filename]
 
-    embeddings, metadata_list = [], []
-    for meta in tqdm(metadata, total=len(metadata), desc=f"Generating Embeddings for {training_type}"):
-        embedding = get_openai_embedding(meta["text"])
-        if embedding is not None:
-            embeddings.append(embedding)
-            metadata_list.append(meta)
+    live = np.zeros(0, dtype=bool) if old_store is None else np.array(old_store.file_ids >= 0)
+    live[stale_ids] = False
 
-    if not embeddings:
+    compacted = len(live) > 0 and np.count_nonzero(~live) > COMPACT_RATIO * len(live)
+    if compacted:
+        print("🧹 Compacting vector IDs...")
+        compact_ids(live, manifest)
+
+    os.makedirs(INDEX_DIR, exist_ok=True)
+
+    # The new metadata is written next to the old file and only swapped in with the index
+    building_metadata_file = f"{METADATA_FILE}.building"
+    writer = MetadataStoreWriter(building_metadata_file)
+    dedup = NearDuplicateFilter(dedup_threshold)
+    for i in range(len(live)):
+        if live[i]:
+            meta = old_store[i]
+            dedup.seed(meta["text"])
+            writer.add(meta)
+        elif not compacted:
+            writer.add(None)
+    if old_store is not None:
+        old_store.close()
+
+    # Chunks of one file are consecutive, so each file gets a contiguous ID range
+    scheduler = make_scheduler(max_in_flight, rpm, tpm)
+    first_new_id = next_id = manifest["next_id"]
+    duplicates = {}
+
+    def count_duplicate(chunk):
+        duplicates[chunk[0]] = duplicates.get(chunk[0], 0) + 1
+
+    # Near-duplicate chunks are dropped before they are embedded, so they never get an ID
+    chunks = dedup.filter(iter_chunks(iter_documents(TEXT_FOLDER, added + changed, extensions, clean_pdf)), itemgetter(1), on_drop=count_duplicate)
+    for batch, embeddings in iter_embeddings(chunks, itemgetter(1), scheduler, desc=f"Embedding new chunks for {training_type}"):
+        for (filename, text), embedding in zip(batch, embeddings):
+            entry = manifest["files"].setdefault(filename, {"sha256": source_hashes[filename], "ids": [next_id, next_id]})
+            entry["ids"][1] = next_id + 1
+            if embedding is None:
+                entry["sha256"] = None  # Retry this file next run
+                writer.add(None)
+            elif is_blank(embedding):
+                writer.add(None)  # Nothing to embed in this chunk; keep its ID slot empty
+            else:
+                writer.add({"filename": filename, "text": text})
+            next_id += 1
+    manifest["next_id"] = next_id
+    writer.close()
+
+    # Files that produced no chunks are still recorded, so they are not re-read every run
+    for filename in added + changed:
+        manifest["files"].setdefault(filename, {"sha256": source_hashes[filename], "ids": [next_id, next_id]})
+    for filename, count in duplicates.items():
+        manifest["files"][filename]["duplicates"] = count
+    if dedup_threshold > 0:
+        print(dedup.report())
+
+    store = MetadataStore(building_metadata_file)
+    live_ids = np.flatnonzero(store.file_ids >= 0)
+    if not len(live_ids):
+        store.close()
+        os.remove(building_metadata_file)
         print("❌ No embeddings generated! Exiting...")
         return
 
-    embeddings = np.array(embeddings, dtype=np.float32)
+    print(f"📂 Found {next_id - first_new_id} new text chunks ({len(live_ids)} in total) in {training_type}. Indexing...")
 
-    if embeddings.shape[0] > 0:
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dimension)
-        index.add(embeddings)
-    else:
-        print("❌ No embeddings to add to FAISS index! Exiting...")
+    result = index_live_chunks(
+        store,
+        scheduler,
+        index_type,
+        codec,
+        pca_dim,
+        index=None if compacted else index,
+        previous_config=manifest.get("index", {}),
+        stale_ids=stale_ids,
+        first_new_id=first_new_id,
+        export_prefix=paths["export"],
+        csv_path=paths["csv"] if export_csv else None,
+        desc=f"Indexing {training_type}",
+        count_cache=False,  # The embedding pass above already counted every new chunk
+    )
+    for i in result["missing"]:
+        manifest["files"][store.filename(i)]["sha256"] = None  # Retry this file next run
+    store.close()
+    if result["index"] is None:
+        os.remove(building_metadata_file)
+        print("❌ No embeddings generated! Exiting...")
         return
+    if result["missing"]:
+        print(f"⚠️ {len(result['missing'])} chunks could not be embedded; their files will be retried on the next run.")
+    index = result["index"]
+    manifest["index"] = result["config"]
 
-    os.makedirs(INDEX_DIR, exist_ok=True)
+    write_index(index, INDEX_FILE)
+    print(f"✅ FAISS index saved at: {INDEX_FILE} ({index.ntotal} vectors)")
+
+    os.replace(building_metadata_file, METADATA_FILE)
+    print(f"✅ Metadata saved at: {METADATA_FILE}")
 
-    INDEX_FILE = os.path.join(INDEX_DIR, f"faiss_index_vt_{training_type}.index")
-    METADATA_FILE = os.path.join(INDEX_DIR, f"metadata_vt_{training_type}.npy")
-    CSV_FILE = os.path.join(INDEX_DIR, f"embeddings_vt_{training_type}.csv")
+    # Keyword index over the same rows; rebuilt whole, since it costs no API calls
+    store = MetadataStore(METADATA_FILE)
+    write_lexical_index(paths["lexical"], store)
+    store.close()
+    print(f"✅ Lexical index saved at: {paths['lexical']}")
 
-    faiss.write_index(index, INDEX_FILE)
-    print(f"✅ FAISS index saved at: {INDEX_FILE}")
+    # The pickled metadata of older builds would now disagree with the index
+    if os.path.exists(LEGACY_METADATA_FILE):
+        os.remove(LEGACY_METADATA_FILE)
 
-    np.save(METADATA_FILE, np.array(metadata_list, dtype=object))
-    print(f"✅ Metadata saved at: {METADATA_FILE}")
+    print(f"✅ Embeddings saved in {EMBED_EXPORT_DTYPE} binary format at: {result['export']}")
 
-    with open(CSV_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Filename", "Text"] + [f"Dim_{i}" for i in range(len(embeddings[0]))])
-        for meta, embed in zip(metadata_list, embeddings):
-            writer.writerow([meta["filename"], meta["text"]] + list(embed))
+    # The CSV dump is many times larger than the vectors, so it is only written on request
+    if export_csv:
+        print(f"✅ Embeddings saved in CSV format at: {CSV_FILE}")
+    elif os.path.exists(CSV_FILE):
+        os.remove(CSV_FILE)
 
-    print(f"✅ Embeddings saved in CSV format at: {CSV_FILE}")
+    manifest["build"] = describe_build(index, INDEX_FILE, METADATA_FILE)
+    save_manifest(MANIFEST_FILE, manifest)
+    print(f"✅ Manifest saved at: {MANIFEST_FILE}")
+
+    stats = get_embedding_cache().stats()
+    print(f"🗄️ Embedding cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+
+# Function to build one index over every corpus, partitioned into contiguous ID ranges
+#
+# Rows are copied from each corpus's metadata in catalog order, so a partition is one ID
+# range and filtered searches only need a range selector per partition.
+def create_combined_index(names=None, index_type=FAISS_INDEX_TYPE, codec=FAISS_CODEC, pca_dim=FAISS_PCA_DIM,
+                          max_in_flight=EMBED_MAX_IN_FLIGHT, rpm=EMBED_RPM, tpm=EMBED_TPM):
+    root = INDEX_ROOT
+    paths = index_paths(COMBINED, root)
+    os.makedirs(paths["dir"], exist_ok=True)
+
+    building_metadata_file = f"{paths['metadata']}.building"
+    writer = MetadataStoreWriter(building_metadata_file)
+    partitions, start = {}, 0
+    for name in names or list(CATALOG):
+        source = CATALOG[resolve_name(name)]
+        store = load_metadata_store(index_paths(source, root)["metadata"])
+        if store is None:
+            print(f"⚠️ Skipping {name}: it has not been built yet.")
+            continue
+        for meta in store:
+            writer.add(meta)
+        partitions[resolve_name(name)] = {
+            "agent": source["agent"],
+            "source": source["source"],
+            "ids": [start, start + len(store)],
+            # Checked on load, so a corpus rebuilt after this is not served from stale vectors
+            "build": partition_build(resolve_name(name), root),
+        }
+        start += len(store)
+    writer.close()
+
+    store = MetadataStore(building_metadata_file)
+    print(f"\n📂 Combining {len(partitions)} indexes ({np.count_nonzero(store.file_ids >= 0)} chunks)...")
+    result = index_live_chunks(
+        store, make_scheduler(max_in_flight, rpm, tpm), index_type, codec, pca_dim, desc="Indexing combined"
+    )
+    store.close()
+    if result["index"] is None:
+        os.remove(building_metadata_file)
+        print("❌ No embeddings generated! Exiting...")
+        return
+
+    write_index(result["index"], paths["index"])
+    print(f"✅ FAISS index saved at: {paths['index']} ({result['index'].ntotal} vectors)")
+    os.replace(building_metadata_file, paths["metadata"])
+    print(f"✅ Metadata saved at: {paths['metadata']}")
+    save_manifest(paths["manifest"], {
+        "version": MANIFEST_VERSION,
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_backend": EMBEDDING_BACKEND.describe(),
+        "partitions": partitions,
+        "index": result["config"],
+        "build": describe_build(result["index"], paths["index"], paths["metadata"]),
+    })
+    print(f"✅ Manifest saved at: {paths['manifest']}")
 
 if __name__ == "__main__":
-    for agent in ["negotiation_sales", "presentation", "behavior_training"]:
-        print(f"\n🚀 Creating FAISS index for Virtual Trainer - {agent.replace('_', ' ').title()} Data...")
-        create_faiss_index(agent)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the FAISS indexes for the coaching corpora.")
+    parser.add_argument("agents", nargs="*", default=list(INDEX_SOURCES), help="Indexes to build (default: all)")
+    parser.add_argument("--incremental", action="store_true", help="Only embed files that changed since the last build")
+    parser.add_argument("--csv", action="store_true", help="Also write the per-dimension CSV dump for debugging")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=FAISS_INDEX_TYPE)
+    parser.add_argument("--codec", choices=CODECS, default=FAISS_CODEC)
+    parser.add_argument("--pca-dim", type=int, default=FAISS_PCA_DIM)
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD, help="Near-duplicate similarity cut-off (0 disables)")
+    parser.add_argument("--combined", action="store_true", help="Also rebuild the combined, partitioned index over every corpus")
+    args = parser.parse_args()
+
+    # All builds share one rate limiter, so the five indexes together stay inside the quota
+    for agent in args.agents:
+        print(f"\n🚀 Creating FAISS index for {agent.replace('_', ' ').title()} Data...")
+        create_faiss_index(
+            agent,
+            incremental=args.incremental,
+            export_csv=args.csv,
+            index_type=args.index_type,
+            codec=args.codec,
+            pca_dim=args.pca_dim,
+            dedup_threshold=args.dedup_threshold,
+        )
+
+    if args.combined:
+        print("\n🚀 Creating combined FAISS index...")
+        create_combined_index(index_type=args.index_type, codec=args.codec, pca_dim=args.pca_dim)
@@ -1,13 +1,22 @@
-from openai import OpenAI
+import asyncio
 import os
-from typing import Dict, List, Optional
+import weakref
+from typing import Dict, Optional, Tuple
 import random
+from openai_client import get_async_client, get_openai_limit
+from session_store import SESSION_SEED_TTL, get_session_store, new_session_state
+
+# Fills the summary step's blanks that the conversation never answered
+class UserData(dict):
+    def __missing__(self, key):
+        return "something we haven't pinned down yet"
 
 class CoachingBot:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        if not self.client.api_key:
+    def __init__(self, state: Optional[Dict] = None):
+        if not os.getenv("OPENAI_API_KEY"):
             raise ValueError("OpenAI API key is missing")
+        # Shared across bots, so a bot per conversation costs no extra connections
+        self.client = get_async_client()
 
         self.system_message = """
         You are Joel, an experienced and quirky ACC-certified executive coach with a fun personality.
@@ -85,11 +94,12 @@ class CoachingBot:
             }
         ]
         
-        self.current_step = 1
+        state = state or new_session_state()
+        self.current_step = state["current_step"]
         self.total_steps = len(self.steps)
         self.conversation_history = {
-            "messages": [],
-            "user_data": {}
+            "messages": list(state["messages"]),
+            "user_data": dict(state["user_data"])
         }
         
         self.opening_lines = [
@@ -103,7 +113,7 @@ class CoachingBot:
             "give me a summary", "summarise this", "wrap up", "brief me"
         ]
 
-    def _get_gpt_response(self, prompt: str) -> str:
+    async def _get_gpt_response(self, prompt: str) -> str:
         try:
             messages = [
                 {"role": "system", "content": self.system_message},
@@ -111,12 +121,13 @@ class CoachingBot:
                 {"role": "user", "content": prompt}
             ]
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                temperature=0.8,
-                max_tokens=150
-            )
+            async with get_openai_limit():
+                response = await self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=messages,
+                    temperature=0.8,
+                    max_tokens=150
+                )
             return response.choices[0].message.content.strip()
         except Exception as e:
             return f"Oops! 🤖 Technical difficulty: {str(e)}"
@@ -126,6 +137,15 @@ class CoachingBot:
         if step_config.get("stores_data"):
             self.conversation_history["user_data"][step_config["stores_data"]] = user_input
 
+    def replay_user_data(self):
+        """Rebuild the stored answers from the messages, for sessions seeded from a client's history."""
+        step = 1
+        for message in self.conversation_history["messages"]:
+            if message["role"] != "user" or self.is_summarization_request(message["content"]):
+                continue
+            self._store_user_data(step, message["content"])
+            step = min(step + 1, self.total_steps)
+
     def is_summarization_request(self, user_input: str) -> bool:
         user_input_lower = user_input.lower().strip()
         for keyword in self.summarization_keywords:
@@ -133,7 +153,7 @@ class CoachingBot:
                 return True
         return False
 
-    def summarize_conversation(self) -> str:
+    async def summarize_conversation(self) -> str:
         try:
             user_data = self.conversation_history["user_data"]
             goal = user_data.get("goal", "Not specified")
@@ -159,7 +179,7 @@ class CoachingBot:
 
             Summary:
             """
-            summary = self._get_gpt_response(prompt)
+            summary = await self._get_gpt_response(prompt)
 
             formatted_summary = (
                 f"**Conversation Summary**\n\n"
@@ -173,7 +193,7 @@ class CoachingBot:
         except Exception as e:
             return f"Error generating summary: {str(e)}"
 
-    def get_step_response(self, user_input: Optional[str] = None) -> str:
+    async def get_step_response(self, user_input: Optional[str] = None) -> str:
         if user_input:
             self._store_user_data(self.current_step, user_input)
             self.conversation_history["messages"].append({"role": "user", "content": user_input})
@@ -181,7 +201,7 @@ class CoachingBot:
         if self.current_step == 1:
             response = random.choice(self.opening_lines)
         elif self.current_step == 10:
-            response = self.steps[9]["prompt"].format(**self.conversation_history["user_data"])
+            response = self.steps[9]["prompt"].format_map(UserData(self.conversation_history["user_data"]))
         else:
             step_goals = self.steps[self.current_step-1]["prompt"]
             last_user_msg = user_input if user_input else (
@@ -204,7 +224,7 @@ class CoachingBot:
             
             Response:
             """
-            response = self._get_gpt_response(prompt)
+            response = await self._get_gpt_response(prompt)
         
         self.conversation_history["messages"].append({"role": "assistant", "content": response})
         if user_input and self.current_step < self.total_steps:
@@ -216,10 +236,43 @@ class CoachingBot:
         self.current_step = 1
         self.conversation_history = {"messages": [], "user_data": {}}
 
-bot = CoachingBot()
+    def state(self) -> Dict:
+        """What the session store keeps between turns."""
+        return {
+            "messages": self.conversation_history["messages"],
+            "user_data": self.conversation_history["user_data"],
+            "current_step": self.current_step
+        }
+
+# One lock per session in this worker, so two turns of the same conversation never interleave
+_session_locks = weakref.WeakValueDictionary()
+
+async def virtual_coach_response(session_id: str, user_input: str, store=None, seed: Optional[Dict] = None) -> Tuple[str, Dict]:
+    """Answer one turn of a stored session and save it; `seed` starts a session the store does not know.
+
+    A seeded session expires after SESSION_SEED_TTL unless its ID comes back, so clients that
+    resend their history every turn leave no long-lived sessions behind.
+    Returns the response and the session's new state.
+    """
+    store = store or get_session_store()
+    lock = _session_locks.setdefault(session_id, asyncio.Lock())
+    async with lock:
+        # Store calls may be disk or network round trips, so they run off the event loop
+        state = await asyncio.to_thread(store.get, session_id)
+        session_bot = CoachingBot(state or seed)
+        seeded = state is None and seed is not None
+        if seeded and not session_bot.conversation_history["user_data"]:
+            session_bot.replay_user_data()
+
+        if session_bot.is_summarization_request(user_input):
+            response = await session_bot.summarize_conversation()
+            session_bot.conversation_history["messages"] += [
+                {"role": "user", "content": user_input},
+                {"role": "assistant", "content": response}
+            ]
+        else:
+            response = await session_bot.get_step_response(user_input)
 
-def virtual_coach_response(conversation_history: List[Dict], user_input: str, current_step: int) -> str:
-    bot.current_step = current_step
-    bot.conversation_history["messages"] = conversation_history.copy()
-    response = bot.get_step_response(user_input)
-    return response
\ No newline at end of file
+        state = session_bot.state()
+        await asyncio.to_thread(store.put, session_id, state, SESSION_SEED_TTL if seeded else None)
+    return response, state
\ No newline at end of file